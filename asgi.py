@@ -0,0 +1,160 @@
+"""Async ASGI entry point for the churn service.
+
+Reuses main.py's startup, feature encoding, model and metrics; only the
+HTTP layer is async. Entity features are read from Redis with redis.asyncio
+on the event loop; CPU-bound scoring runs in a bounded thread pool so the
+event loop keeps accepting requests. Requires fastapi and uvicorn:
+
+    uvicorn asgi:app --host 0.0.0.0 --port 8000
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+
+import main as service
+from config.feature_config import FEATURE_COLUMNS
+
+# Scoring threads, and how many requests may wait for one before new
+# requests are turned away with 503
+SCORING_THREADS = int(os.getenv('ASGI_SCORING_THREADS', 4))
+SCORING_QUEUE_LIMIT = int(os.getenv('ASGI_SCORING_QUEUE_LIMIT', 256))
+
+executor = ThreadPoolExecutor(max_workers=SCORING_THREADS, thread_name_prefix='scoring')
+scoring_slots = asyncio.Semaphore(SCORING_THREADS + SCORING_QUEUE_LIMIT)
+
+# redis.asyncio client of the feature store, created on first use
+feature_client = None
+
+
+async def run_scoring(fn, *args):
+    """Run a CPU-bound call on the scoring pool"""
+    if scoring_slots.locked():
+        raise OverflowError("Scoring queue is full")
+    async with scoring_slots:
+        return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    service.start_background_initialization()
+    yield
+    executor.shutdown(wait=False)
+    if feature_client is not None:
+        await feature_client.aclose()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+async def fetch_entity_rows(entity_ids):
+    """Feature rows of customers, one MGET per page of the store's
+    chunk_size ids, without blocking the loop"""
+    global feature_client
+    store = service.get_feature_store()
+    if feature_client is None:
+        feature_client = store.async_raw_client()
+    values = []
+    for i in range(0, len(entity_ids), store.chunk_size):
+        values.extend(await feature_client.mget(store.feature_keys(entity_ids[i:i + store.chunk_size])))
+    found_ids, X, _ = store.decode_matrix(entity_ids, values, FEATURE_COLUMNS)
+    return found_ids, X
+
+
+async def score_entities(entity_ids):
+    """main.score_entities with the feature store read awaited here and
+    only the model call on the scoring pool"""
+    bundle = service.serving
+    version = bundle.version
+    entity_ids, results, rows, to_fetch = service.lookup_entities(entity_ids, version)
+    if to_fetch:
+        rows.update(service.cache_entity_rows(version, *await fetch_entity_rows(to_fetch)))
+
+    scored = [entity_id for entity_id in entity_ids if entity_id not in results and entity_id in rows]
+    if scored:
+        features = np.stack([rows[entity_id] for entity_id in scored])
+        predictions = await run_scoring(partial(service.score_features, record_drift=False), features, bundle)
+        results.update(service.cache_entity_results(version, scored, predictions))
+
+    return service.entity_results(entity_ids, results)
+
+
+async def read_payload(request):
+    if request.headers.get('content-type', '').startswith('application/json'):
+        return await request.json()
+    return dict(await request.form())
+
+
+@app.post('/predict')
+async def predict(request: Request):
+    """Async /predict with the same encoding and response as main.py"""
+    if not service.startup_state['model_ready']:
+        return JSONResponse({'error': 'Model is not loaded yet', 'status': 'starting'}, status_code=503)
+    try:
+        data = await read_payload(request)
+        bundle = service.serving
+        features = bundle.encoder.encode(data).reshape(1, -1)
+
+        if service.micro_batcher is not None:
+            result = await asyncio.wrap_future(service.micro_batcher.submit(features))
+        else:
+            result = (await run_scoring(service.score_features, features, bundle))[0]
+        return JSONResponse(result)
+
+    except OverflowError as e:
+        return JSONResponse({'error': str(e)}, status_code=503)
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=400)
+
+
+@app.get('/predict/entity/{entity_id}')
+async def predict_entity(entity_id: str):
+    """Score one customer from the feature store by CLIENTNUM"""
+    if not service.startup_state['model_ready']:
+        return JSONResponse({'error': 'Model is not loaded yet', 'status': 'starting'}, status_code=503)
+    try:
+        results, _ = await score_entities([entity_id])
+        if entity_id not in results:
+            return JSONResponse({'error': f'No stored features for entity {entity_id}'}, status_code=404)
+        return JSONResponse(results[entity_id])
+
+    except OverflowError as e:
+        return JSONResponse({'error': str(e)}, status_code=503)
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=400)
+
+
+@app.post('/predict/entities')
+async def predict_entities(request: Request):
+    """Score many customers by CLIENTNUM, ``{"entity_ids": [...]}``"""
+    if not service.startup_state['model_ready']:
+        return JSONResponse({'error': 'Model is not loaded yet', 'status': 'starting'}, status_code=503)
+    try:
+        payload = await request.json()
+        entity_ids = payload.get('entity_ids') if isinstance(payload, dict) else payload
+        if not isinstance(entity_ids, list):
+            raise ValueError("Expected a JSON array or an entity_ids list")
+
+        results, missing = await score_entities(entity_ids)
+        return JSONResponse({'predictions': list(results.values()), 'count': len(results), 'missing': missing})
+
+    except OverflowError as e:
+        return JSONResponse({'error': str(e)}, status_code=503)
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=400)
+
+
+@app.get('/health')
+async def health():
+    return JSONResponse(service.health_status())
+
+
+@app.get('/metrics')
+async def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
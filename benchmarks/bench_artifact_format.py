@@ -0,0 +1,55 @@
+"""File size, write time and load time of the raw interchange artifacts:
+CSV (the original train_data.csv path) vs a partitioned Parquet dataset,
+for a full load and for the column projection preprocessing does.
+
+    python -m benchmarks.bench_artifact_format --rows 500000
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from benchmarks.data import make_raw_table
+from config.feature_config import RAW_COLUMNS
+from src.artifact_io import read_frame, write_frame
+
+
+def size_of(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+    return os.path.getsize(path)
+
+
+def timed(fn, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=500000)
+    parser.add_argument('--rows-per-part', type=int, default=100000)
+    args = parser.parse_args()
+
+    df = make_raw_table(args.rows)
+    workdir = tempfile.mkdtemp()
+    targets = {
+        'csv': os.path.join(workdir, 'train_data.csv'),
+        'parquet': os.path.join(workdir, 'train'),
+    }
+
+    print(f"{args.rows} rows x {df.shape[1]} columns")
+    print(f"{'format':<8} {'size MiB':>9} {'write s':>8} {'load s':>8} {'projected load s':>17}")
+    for fmt, path in targets.items():
+        write_time, _ = timed(lambda: write_frame(df, path, fmt, args.rows_per_part), repeat=1)
+        load_time, full = timed(lambda: read_frame(path))
+        projected_time, projected = timed(lambda: read_frame(path, columns=RAW_COLUMNS))
+        assert len(full) == len(df) and list(projected.columns) == RAW_COLUMNS
+        print(f"{fmt:<8} {size_of(path) / 2**20:9.1f} {write_time:8.2f} {load_time:8.3f} {projected_time:17.3f}")
+
+    shutil.rmtree(workdir)
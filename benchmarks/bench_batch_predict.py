@@ -0,0 +1,55 @@
+"""Throughput of /predict (one customer per call) vs /predict/batch.
+
+Run from the repo root with Redis and the model available:
+
+    python -m benchmarks.bench_batch_predict --rows 10000
+"""
+import argparse
+import json
+import time
+
+import main
+from benchmarks.data import make_customers
+
+
+def bench_single(client, customers):
+    start = time.perf_counter()
+    for customer in customers:
+        response = client.post('/predict', json=customer)
+        assert response.status_code == 200, response.get_json()
+    return time.perf_counter() - start
+
+
+def bench_batch(client, customers, ndjson=False):
+    start = time.perf_counter()
+    if ndjson:
+        body = "\n".join(json.dumps(customer) for customer in customers)
+        response = client.post('/predict/batch', data=body, content_type='application/x-ndjson')
+    else:
+        response = client.post('/predict/batch', json=customers)
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['count'] == len(customers)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--single-rows', type=int, default=1000,
+                        help="rows sent through /predict (extrapolated to --rows)")
+    args = parser.parse_args()
+
+    main.wait_until_ready()
+
+    client = main.app.test_client()
+    customers = make_customers(args.rows)
+
+    single = bench_single(client, customers[:args.single_rows])
+    single_rps = args.single_rows / single
+    batch = bench_batch(client, customers)
+    ndjson = bench_batch(client, customers, ndjson=True)
+
+    print(f"/predict         : {single_rps:10.0f} rows/s  ({args.single_rows} calls in {single:.2f}s)")
+    print(f"/predict/batch   : {args.rows / batch:10.0f} rows/s  ({args.rows} rows in {batch:.2f}s)")
+    print(f"/predict/batch nd: {args.rows / ndjson:10.0f} rows/s  ({args.rows} rows in {ndjson:.2f}s)")
+    print(f"speedup (json)   : {(args.rows / batch) / single_rps:10.1f}x")
@@ -0,0 +1,143 @@
+"""Microbenchmark: table-driven FeatureEncoder vs the old dict-based
+prepare_features + one-row DataFrame path that /predict used, and the
+fitted FeatureTransformer vs the get_dummies + reindex preprocessing used.
+
+    python -m benchmarks.bench_feature_encoder --rows 10000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.data import make_customers, make_raw_table
+from config.feature_config import FEATURE_COLUMNS, CATEGORICAL_COLUMNS
+from src.feature_encoder import FORM_FIELDS
+from src.feature_transformer import FeatureTransformer
+
+
+def legacy_prepare_features(form_data):
+    """Convert form data to model input with one-hot encoding"""
+    
+    # Initialize all features with 0
+    features = {col: 0 for col in FEATURE_COLUMNS}
+    
+    # Set numeric features directly
+    features['Contacts_Count_12_mon'] = int(form_data.get('contacts_count', 0))
+    features['Months_Inactive_12_mon'] = int(form_data.get('months_inactive', 0))
+    features['Dependent_count'] = int(form_data.get('dependent_count', 0))
+    features['Customer_Age'] = int(form_data.get('customer_age', 0))
+    features['Months_on_book'] = int(form_data.get('months_on_book', 0))
+    features['Avg_Open_To_Buy'] = float(form_data.get('avg_open_to_buy', 0))
+    features['Credit_Limit'] = float(form_data.get('credit_limit', 0))
+    features['Total_Amt_Chng_Q4_Q1'] = float(form_data.get('total_amt_chng', 0))
+    features['Total_Relationship_Count'] = int(form_data.get('total_relationship_count', 0))
+    features['Total_Trans_Amt'] = float(form_data.get('total_trans_amt', 0))
+    features['Avg_Utilization_Ratio'] = float(form_data.get('avg_utilization_ratio', 0))
+    features['Total_Revolving_Bal'] = float(form_data.get('total_revolving_bal', 0))
+    features['Total_Ct_Chng_Q4_Q1'] = float(form_data.get('total_ct_chng', 0))
+    features['Total_Trans_Ct'] = int(form_data.get('total_trans_ct', 0))
+    
+    # Gender: M=1, F=0
+    features['Gender'] = 1 if form_data.get('gender') == 'M' else 0
+    
+    # One-hot encode Education Level
+    education = form_data.get('education_level')
+    if education == 'Doctorate':
+        features['Education_Level_Doctorate'] = 1
+    elif education == 'Post-Graduate':
+        features['Education_Level_Post-Graduate'] = 1
+    elif education == 'Graduate':
+        features['Education_Level_Graduate'] = 1
+    elif education == 'High School':
+        features['Education_Level_High School'] = 1
+    elif education == 'Uneducated':
+        features['Education_Level_Uneducated'] = 1
+    elif education == 'Unknown':
+        features['Education_Level_Unknown'] = 1
+    
+    # One-hot encode Marital Status
+    marital = form_data.get('marital_status')
+    if marital == 'Single':
+        features['Marital_Status_Single'] = 1
+    elif marital == 'Married':
+        features['Marital_Status_Married'] = 1
+    elif marital == 'Unknown':
+        features['Marital_Status_Unknown'] = 1
+    
+    # One-hot encode Income Category
+    income = form_data.get('income_category')
+    if income == 'Less than $40K':
+        features['Income_Category_Less than $40K'] = 1
+    elif income == '$40K - $60K':
+        features['Income_Category_$40K - $60K'] = 1
+    elif income == '$60K - $80K':
+        features['Income_Category_$60K - $80K'] = 1
+    elif income == '$80K - $120K':
+        features['Income_Category_$80K - $120K'] = 1
+    elif income == 'Unknown':
+        features['Income_Category_Unknown'] = 1
+    
+    # One-hot encode Card Category
+    card = form_data.get('card_category')
+    if card == 'Platinum':
+        features['Card_Category_Platinum'] = 1
+    elif card == 'Gold':
+        features['Card_Category_Gold'] = 1
+    elif card == 'Silver':
+        features['Card_Category_Silver'] = 1
+    
+    return features
+
+
+def timed(fn, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=10000)
+    args = parser.parse_args()
+
+    raw = make_raw_table(args.rows)
+    transformer = FeatureTransformer().fit(raw)
+    encoder = transformer.encoder(FORM_FIELDS)
+    customers = make_customers(args.rows)
+    columns = {field: [c[field] for c in customers] for field in customers[0]}
+
+    legacy_row, legacy_rows = timed(lambda: [
+        pd.DataFrame([legacy_prepare_features(c)], columns=FEATURE_COLUMNS) for c in customers
+    ])
+    legacy_block, legacy_frame = timed(lambda: pd.DataFrame(
+        [legacy_prepare_features(c) for c in customers], columns=FEATURE_COLUMNS
+    ))
+    row, _ = timed(lambda: [encoder.encode(c) for c in customers])
+    block, records_block = timed(lambda: encoder.encode_records(customers))
+    columnar, columns_block = timed(lambda: encoder.encode_columns(columns))
+
+    expected = legacy_frame.to_numpy(dtype=np.float32)
+    assert np.array_equal(records_block, expected)
+    assert np.array_equal(columns_block, expected)
+
+    def legacy_preprocess():
+        frame = raw.assign(Gender=raw['Gender'].map({'M': 1, 'F': 0}))
+        frame = pd.get_dummies(frame, columns=CATEGORICAL_COLUMNS)
+        return frame.reindex(columns=FEATURE_COLUMNS, fill_value=0).to_numpy(dtype=np.float32)
+
+    legacy_frame_time, legacy_matrix = timed(legacy_preprocess)
+    transform_time, matrix = timed(lambda: transformer.transform(raw))
+    assert np.array_equal(matrix, legacy_matrix)
+
+    n = args.rows
+    print(f"legacy dict + 1-row DataFrame : {1e6 * legacy_row / n:8.2f} us/row")
+    print(f"legacy dicts -> one DataFrame : {1e6 * legacy_block / n:8.2f} us/row")
+    print(f"FeatureEncoder.encode         : {1e6 * row / n:8.2f} us/row")
+    print(f"FeatureEncoder.encode_records : {1e6 * block / n:8.2f} us/row")
+    print(f"FeatureEncoder.encode_columns : {1e6 * columnar / n:8.2f} us/row")
+    print(f"get_dummies + reindex (train) : {1e6 * legacy_frame_time / n:8.2f} us/row")
+    print(f"FeatureTransformer.transform  : {1e6 * transform_time / n:8.2f} us/row")
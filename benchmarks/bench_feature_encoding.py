@@ -0,0 +1,58 @@
+"""Bytes per entity and decode time per 10k entities for the JSON and the
+binary feature-store value layouts.
+
+    python -m benchmarks.bench_feature_encoding
+    python -m benchmarks.bench_feature_encoding --port 6399   # adds MEMORY USAGE
+"""
+import argparse
+import json
+import time
+
+import redis
+
+from benchmarks.bench_feature_store import make_batch
+from src.feature_store import decode_features, encode_features
+
+
+def decode_time(values, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for value in values:
+            decode_features(value)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def redis_memory(client, values):
+    client.flushdb()
+    pipe = client.pipeline(transaction=False)
+    for i, value in enumerate(values):
+        pipe.set(f"entity:{i}:features", value)
+    pipe.execute()
+    usage = sum(client.memory_usage(f"entity:{i}:features") for i in range(len(values)))
+    client.flushdb()
+    return usage / len(values)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--entities', type=int, default=10000)
+    parser.add_argument('--port', type=int, default=None, help="local redis-server for MEMORY USAGE")
+    parser.add_argument('--db', type=int, default=15)
+    args = parser.parse_args()
+
+    batch = list(make_batch(args.entities).values())
+    layouts = {
+        'json': [json.dumps(features).encode() for features in batch],
+        'binary': [encode_features(features) for features in batch],
+    }
+
+    client = redis.StrictRedis(port=args.port, db=args.db) if args.port else None
+    per_10k = 10000 / args.entities
+    for name, values in layouts.items():
+        size = sum(len(value) for value in values) / len(values)
+        line = f"{name:<7}: {size:7.1f} value bytes/entity  {decode_time(values) * per_10k * 1000:8.2f} ms decode/10k"
+        if client is not None:
+            line += f"  {redis_memory(client, values):7.1f} redis bytes/entity"
+        print(line)
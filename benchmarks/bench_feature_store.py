@@ -0,0 +1,84 @@
+"""Round trips and wall time for bulk feature-store reads/writes against a
+local redis-server: one command per entity vs pipelined/MGET chunks.
+
+    redis-server --port 6399 &
+    python -m benchmarks.bench_feature_store --port 6399 --entities 10000
+"""
+import argparse
+import random
+import time
+
+import redis
+
+from config.feature_config import FEATURE_COLUMNS, LABEL_COLUMN
+from src.feature_store import RedisFeatureStore
+
+
+class CountingConnection(redis.Connection):
+    """Connection that counts the packets written to the server"""
+    round_trips = 0
+
+    def send_packed_command(self, command, check_health=True):
+        CountingConnection.round_trips += 1
+        return super().send_packed_command(command, check_health)
+
+
+def make_batch(n, seed=42):
+    rng = random.Random(seed)
+    columns = [LABEL_COLUMN] + FEATURE_COLUMNS
+    return {
+        str(700000000 + i): {column: rng.random() for column in columns}
+        for i in range(n)
+    }
+
+
+def measure(label, fn):
+    CountingConnection.round_trips = 0
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<36}: {CountingConnection.round_trips:8d} round trips {elapsed:8.3f}s")
+    return elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=6379)
+    parser.add_argument('--db', type=int, default=15, help="scratch db, flushed by the benchmark")
+    parser.add_argument('--entities', type=int, default=10000)
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    store = RedisFeatureStore(host=args.host, port=args.port, db=args.db, chunk_size=args.chunk_size)
+    # Feature values go through raw_client, the index through client
+    for client in (store.client, store.raw_client):
+        client.connection_pool.connection_class = CountingConnection
+    store.client.flushdb()
+
+    batch = make_batch(args.entities)
+    entity_ids = list(batch)
+
+    def write_serial():
+        for entity_id, features in batch.items():
+            store.store_features(entity_id, features)
+
+    def read_serial():
+        return {entity_id: store.get_features(entity_id) for entity_id in entity_ids}
+
+    write_before = measure("store_features loop", write_serial)
+    read_before = measure("get_features loop", read_serial)
+    store.client.flushdb()
+
+    write_after = measure("store_batch_features (pipeline)", lambda: store.store_batch_features(batch))
+    read_after = measure("get_batch_features (MGET)", lambda: store.get_batch_features(entity_ids))
+    store.client.flushdb()
+
+    measure(f"store_batch_features x{args.workers} workers",
+            lambda: store.store_batch_features(batch, max_workers=args.workers))
+    measure(f"get_batch_features x{args.workers} workers",
+            lambda: store.get_batch_features(entity_ids, max_workers=args.workers))
+    store.client.flushdb()
+
+    print(f"write speedup: {write_before / write_after:.1f}x  read speedup: {read_before / read_after:.1f}x")
@@ -0,0 +1,70 @@
+"""Peak Python memory and wall time of DataIngestion reading a table whole
+(pd.read_sql_query + train_test_split) vs streaming it in fetch_size chunks
+with the CLIENTNUM hash split. Uses a SQLite file as the database stand-in.
+
+    python -m benchmarks.bench_ingestion --rows 200000 --fetch-size 10000
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from benchmarks.data import make_customers
+
+
+def build_table(path, n_rows):
+    conn = sqlite3.connect(path)
+    customers = pd.DataFrame(make_customers(min(n_rows, 10000)))
+    for start in range(0, n_rows, len(customers)):
+        block = customers.iloc[:n_rows - start].copy()
+        block['CLIENTNUM'] = range(700000000 + start, 700000000 + start + len(block))
+        block.to_sql('customers', conn, if_exists='append', index=False)
+    conn.close()
+
+
+def measure(label, fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28}: {elapsed:8.2f}s peak {peak / 2**20:8.1f} MiB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--fetch-size', type=int, default=10000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.chdir(workdir)
+    os.environ['INGEST_TABLE'] = 'customers'
+    database = os.path.join(workdir, 'customers.db')
+    build_table(database, args.rows)
+
+    from config.path_config import RAW_DIR
+    from src.artifact_io import read_frame
+    from src.data_ingestion import DataIngestion
+
+    def run(streaming):
+        ingestion = DataIngestion(None, RAW_DIR, streaming=streaming, fetch_size=args.fetch_size,
+                                  connect=lambda: sqlite3.connect(database))
+        ingestion.run()
+        return ingestion.output_paths
+
+    paths = {}
+
+    print(f"{args.rows} rows, fetch size {args.fetch_size}")
+    measure("read_sql_query + split", lambda: run(False))
+    measure("streaming, hash split", lambda: paths.update(run(True)))
+
+    # Parquet datasets or CSVs, whichever ARTIFACT_FORMAT the run wrote
+    train = read_frame(paths['train'], columns=['CLIENTNUM'])
+    test = read_frame(paths['test'], columns=['CLIENTNUM'])
+    print(f"streamed split: {len(train)} train / {len(test)} test, overlap {len(set(train.CLIENTNUM) & set(test.CLIENTNUM))}")
@@ -0,0 +1,70 @@
+"""Rows/s of the S3 -> PostgreSQL loaders in dags/s3_etl_to_psql.py:
+DataFrame.to_sql (the original) vs streaming COPY FROM STDIN into a staging
+table. With --s3-endpoint the CSV is put in a MinIO / moto bucket and the
+COPY reads the object body directly, as the DAG does.
+
+    moto_server -p 5055 &        # or MinIO
+    python -m benchmarks.bench_pg_load --dsn postgresql://user:pw@localhost/churn \
+        --s3-endpoint http://localhost:5055 --rows 200000
+"""
+import argparse
+import io
+import tempfile
+
+import psycopg2
+import sqlalchemy
+
+from benchmarks.data import make_raw_table
+from include.pg_bulk_load import copy_csv_stream, to_sql_load
+
+
+def open_body(args, payload):
+    """Readable stream of the CSV: an S3 object body, or an in-memory file"""
+    if not args.s3_endpoint:
+        return io.BytesIO(payload)
+    import boto3
+
+    s3 = boto3.client('s3', endpoint_url=args.s3_endpoint, aws_access_key_id='test',
+                      aws_secret_access_key='test', region_name='us-east-1')
+    if args.bucket not in [bucket['Name'] for bucket in s3.list_buckets()['Buckets']]:
+        s3.create_bucket(Bucket=args.bucket)
+    s3.put_object(Bucket=args.bucket, Key='raw.csv', Body=payload)
+    return s3.get_object(Bucket=args.bucket, Key='raw.csv')['Body']
+
+
+def count_rows(dsn, table):
+    with psycopg2.connect(dsn) as conn, conn.cursor() as cursor:
+        cursor.execute(f'SELECT count(*) FROM "{table}"')
+        return cursor.fetchone()[0]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--dsn', required=True)
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--s3-endpoint', default=None)
+    parser.add_argument('--bucket', default='churn-bench')
+    parser.add_argument('--keep-long-columns', dest='drop_long_columns', action='store_false',
+                        help="keep the Naive_Bayes_* columns (to_sql fails on them, COPY shortens them)")
+    args = parser.parse_args()
+
+    table = make_raw_table(args.rows)
+    if args.drop_long_columns:
+        # to_sql cannot create these: both truncate to the same 63-byte name
+        table = table[[column for column in table.columns if len(column) <= 63]]
+    payload = table.to_csv(index=False).encode()
+    print(f"{args.rows} rows, {len(payload) / 2**20:.1f} MiB of CSV")
+
+    with tempfile.NamedTemporaryFile(suffix='.csv') as local_file:
+        local_file.write(payload)
+        local_file.flush()
+        engine = sqlalchemy.create_engine(args.dsn.replace('postgresql://', 'postgresql+psycopg2://', 1))
+        rows, seconds = to_sql_load(engine, local_file.name, 'customerchurn_to_sql')
+        print(f"{'to_sql':<8}: {rows} rows in {seconds:7.2f}s {rows / seconds:10.0f} rows/s "
+              f"({count_rows(args.dsn, 'customerchurn_to_sql')} in table)")
+
+    conn = psycopg2.connect(args.dsn)
+    rows, seconds = copy_csv_stream(conn, open_body(args, payload), 'customerchurn_copy')
+    conn.close()
+    print(f"{'COPY':<8}: {rows} rows in {seconds:7.2f}s {rows / seconds:10.0f} rows/s "
+          f"({count_rows(args.dsn, 'customerchurn_copy')} in table)")
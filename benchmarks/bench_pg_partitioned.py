@@ -0,0 +1,106 @@
+"""Partitioned S3 -> PostgreSQL load as run by dags/s3_etl_to_psql.py:
+plan byte-range partitions of the objects in a bucket, COPY them with a
+pool of workers (standing in for the mapped Airflow tasks) into the staging
+table, load one partition a second time as a retried task would, reconcile
+row counts and swap the staging table in.
+
+    moto_server -p 5055 &        # or MinIO
+    python -m benchmarks.bench_pg_partitioned --dsn postgresql://user:pw@localhost/churn \
+        --s3-endpoint http://localhost:5055 --rows 400000 --objects 2 --split-mb 8 --workers 1 4
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+import psycopg2
+
+from benchmarks.data import make_raw_table
+from include.pg_bulk_load import (
+    LineRangeStream,
+    copy_partition,
+    csv_header,
+    infer_columns,
+    plan_partitions,
+    prepare_staging,
+    read_sample,
+    reconcile_partitions,
+    staging_table,
+    swap_staging,
+)
+
+
+def put_objects(s3, bucket, table, n_objects):
+    if bucket not in [b['Name'] for b in s3.list_buckets()['Buckets']]:
+        s3.create_bucket(Bucket=bucket)
+    size = -(-len(table) // n_objects)
+    keys = []
+    for i in range(n_objects):
+        key = f"raw-{i:03d}.csv"
+        s3.put_object(Bucket=bucket, Key=key, Body=table.iloc[i * size:(i + 1) * size].to_csv(index=False).encode())
+        keys.append(key)
+    return keys
+
+
+def plan(s3, bucket, keys, conn, target, split_bytes):
+    objects = []
+    column_types = None
+    for key in keys:
+        head = s3.head_object(Bucket=bucket, Key=key)
+        body = s3.get_object(Bucket=bucket, Key=key, Range="bytes=0-8388607")['Body']
+        sample = read_sample(body)
+        body.close()
+        column_types = column_types or infer_columns(sample)
+        objects.append({"key": key, "size": head['ContentLength'], "etag": head['ETag'], "columns": csv_header(sample)})
+    partitions = plan_partitions(objects, split_bytes)
+    prepare_staging(conn, target, column_types, partitions)
+    return partitions
+
+
+def load(args, s3, partition, target):
+    conn = psycopg2.connect(args.dsn)
+    body = s3.get_object(Bucket=args.bucket, Key=partition["object_key"],
+                         Range=f"bytes={max(partition['start'] - 1, 0)}-")['Body']
+    try:
+        stream = LineRangeStream(body, partition["start"], partition["end"])
+        return copy_partition(conn, stream, staging_table(target), partition)[0]
+    finally:
+        body.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--dsn', required=True)
+    parser.add_argument('--s3-endpoint', required=True)
+    parser.add_argument('--bucket', default='churn-bench-partitioned')
+    parser.add_argument('--rows', type=int, default=400000)
+    parser.add_argument('--objects', type=int, default=2)
+    parser.add_argument('--split-mb', type=float, default=8)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4])
+    args = parser.parse_args()
+
+    s3 = boto3.client('s3', endpoint_url=args.s3_endpoint, aws_access_key_id='test',
+                      aws_secret_access_key='test', region_name='us-east-1')
+    keys = put_objects(s3, args.bucket, make_raw_table(args.rows), args.objects)
+
+    for workers in args.workers:
+        target = f"customerchurn_partitioned_{workers}"
+        conn = psycopg2.connect(args.dsn)
+        with conn.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS "{target}", "{target}__ledger", "{target}__staging", "{target}__staging__ledger"')
+        conn.commit()
+
+        partitions = plan(s3, args.bucket, keys, conn, target, int(args.split_mb * 2**20))
+        start = time.perf_counter()
+        with ThreadPoolExecutor(workers) as pool:
+            rows = sum(pool.map(lambda partition: load(args, s3, partition, target), partitions))
+        seconds = time.perf_counter() - start
+
+        # A retried task reloads its partition: same rows, no duplicates
+        load(args, s3, partitions[len(partitions) // 2], target)
+        summary = reconcile_partitions(conn, staging_table(target), [p["source_key"] for p in partitions])
+        swap_staging(conn, target)
+        conn.close()
+        print(f"{workers} workers: {len(partitions)} partitions, {rows} rows in {seconds:6.2f}s "
+              f"{rows / seconds:9.0f} rows/s, {summary['rows']} rows after a retried partition")
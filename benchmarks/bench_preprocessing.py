@@ -0,0 +1,68 @@
+"""Peak Python memory and wall time of DataProcessing over a raw Parquet
+dataset: the whole table in memory vs two streaming passes of --chunk-size
+rows. Features go to a store that only counts rows unless --redis-port
+points at a redis-server; both runs write the processed Parquet dataset,
+which is compared at the end.
+
+    python -m benchmarks.bench_preprocessing --rows 500000 --chunk-size 50000
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.data import make_raw_table
+from src.artifact_io import read_frame, write_frame
+from src.data_preprocessing import DataProcessing
+from src.feature_store import RedisFeatureStore
+
+
+class CountingStore:
+    """Feature store stand-in that drops the rows it is given"""
+
+    def __init__(self):
+        self.rows = 0
+
+    def store_matrix(self, entity_ids, matrix, columns):
+        self.rows += len(matrix)
+
+
+def measure(label, fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<10}: {elapsed:7.2f}s peak {peak / 2**20:8.1f} MiB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=500000)
+    parser.add_argument('--chunk-size', type=int, default=50000)
+    parser.add_argument('--redis-port', type=int, default=None)
+    args = parser.parse_args()
+
+    def store():
+        return RedisFeatureStore(port=args.redis_port) if args.redis_port else CountingStore()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        raw_path = os.path.join(tmp, 'train')
+        write_frame(make_raw_table(args.rows), raw_path, rows_per_part=args.chunk_size)
+        print(f"{args.rows} rows in {len(os.listdir(raw_path))} parts")
+
+        paths = {mode: os.path.join(tmp, f'features_{mode}') for mode in ('in-memory', 'chunked')}
+        measure('in-memory', lambda: DataProcessing(
+            raw_path, None, store(), paths['in-memory'], os.path.join(tmp, 'transformer_in_memory.json')).run())
+        measure('chunked', lambda: DataProcessing(
+            raw_path, None, store(), paths['chunked'], os.path.join(tmp, 'transformer_chunked.json'),
+            chunk_size=args.chunk_size).run())
+
+        expected, actual = read_frame(paths['in-memory']), read_frame(paths['chunked'])
+        assert list(expected.columns) == list(actual.columns)
+        assert np.array_equal(expected.to_numpy(), actual.to_numpy())
+        print("processed features identical")
@@ -0,0 +1,56 @@
+"""Latency of the inference backends at batch sizes 1, 64 and 4096, plus the
+max |difference| of the compiled engine against LightGBM.
+
+    python -m benchmarks.bench_tree_inference                      # synthetic model
+    python -m benchmarks.bench_tree_inference --model artifacts/models/lgb_model.pkl
+"""
+import argparse
+import pickle
+import time
+
+import lightgbm as lgb
+import numpy as np
+
+from config.feature_config import FEATURE_COLUMNS
+from src.tree_inference import CompiledBooster, build_predictor
+
+
+def synthetic_model(n_rows=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.random((n_rows, len(FEATURE_COLUMNS)))
+    y = (X[:, 0] + 0.5 * X[:, 5] + rng.normal(0, 0.3, n_rows) > 0.9).astype(int)
+    return lgb.LGBMClassifier(n_estimators=150, num_leaves=31, verbose=-1).fit(X, y), X
+
+
+def latency_ms(fn, X, repeat):
+    fn(X)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(X)
+    return 1000 * (time.perf_counter() - start) / repeat
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', default=None, help="pickled LGBMClassifier")
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    if args.model:
+        with open(args.model, 'rb') as f:
+            model = pickle.load(f)
+        X = CompiledBooster.from_model(model).probe_inputs(4096)
+    else:
+        model, X = synthetic_model()
+
+    compiled = CompiledBooster.from_model(model)
+    print(f"trees={compiled.n_trees} max_depth={compiled.max_depth} "
+          f"max|diff| probe={compiled.verify(model):.3g} data={compiled.verify(model, X):.3g}")
+
+    backends = {name: build_predictor(model, name) for name in ("sklearn", "booster", "compiled")}
+    print(f"{'batch':>6} " + " ".join(f"{name + ' ms':>12}" for name in backends))
+    for batch in (1, 64, 4096):
+        Xb = np.resize(X, (batch, X.shape[1])).astype(np.float32)
+        repeat = max(3, args.repeat * 64 // max(batch, 64))
+        timings = [latency_ms(predictor.predict_proba, Xb, repeat) for predictor in backends.values()]
+        print(f"{batch:>6} " + " ".join(f"{t:12.3f}" for t in timings))
@@ -0,0 +1,68 @@
+"""Synthetic customers shaped like the /predict form payload."""
+import random
+
+
+def make_customers(n, seed=42):
+    rng = random.Random(seed)
+    customers = []
+    for _ in range(n):
+        customers.append({
+            'customer_age': rng.randint(26, 73),
+            'gender': rng.choice(['M', 'F']),
+            'dependent_count': rng.randint(0, 5),
+            'education_level': rng.choice(['Graduate', 'High School', 'Unknown', 'Uneducated',
+                                            'College', 'Post-Graduate', 'Doctorate']),
+            'marital_status': rng.choice(['Married', 'Single', 'Unknown', 'Divorced']),
+            'income_category': rng.choice(['Less than $40K', '$40K - $60K', '$60K - $80K',
+                                           '$80K - $120K', '$120K +', 'Unknown']),
+            'card_category': rng.choice(['Blue', 'Silver', 'Gold', 'Platinum']),
+            'months_on_book': rng.randint(13, 56),
+            'total_relationship_count': rng.randint(1, 6),
+            'months_inactive': rng.randint(0, 6),
+            'contacts_count': rng.randint(0, 6),
+            'credit_limit': round(rng.uniform(1438.3, 34516.0), 1),
+            'total_revolving_bal': rng.randint(0, 2517),
+            'avg_open_to_buy': round(rng.uniform(3.0, 34516.0), 1),
+            'total_amt_chng': round(rng.uniform(0.0, 3.4), 3),
+            'total_trans_amt': rng.randint(510, 18484),
+            'total_trans_ct': rng.randint(10, 139),
+            'total_ct_chng': round(rng.uniform(0.0, 3.7), 3),
+            'avg_utilization_ratio': round(rng.uniform(0.0, 1.0), 3),
+        })
+    return customers
+
+
+def make_raw_table(n, seed=42):
+    """Synthetic rows of the source table (BankChurners columns)"""
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    naive_bayes = 'Naive_Bayes_Classifier_Attrition_Flag_Card_Category_Contacts_Count_12_mon_Dependent_count_Education_Level_Months_Inactive_12_mon_'
+    return pd.DataFrame({
+        'CLIENTNUM': 700000000 + rng.permutation(n),
+        'Attrition_Flag': rng.choice(['Existing Customer', 'Attrited Customer'], n, p=[0.84, 0.16]),
+        'Customer_Age': rng.integers(26, 74, n),
+        'Gender': rng.choice(['M', 'F'], n),
+        'Dependent_count': rng.integers(0, 6, n),
+        'Education_Level': rng.choice(['Graduate', 'High School', 'Unknown', 'Uneducated',
+                                       'College', 'Post-Graduate', 'Doctorate'], n),
+        'Marital_Status': rng.choice(['Married', 'Single', 'Unknown', 'Divorced'], n),
+        'Income_Category': rng.choice(['Less than $40K', '$40K - $60K', '$60K - $80K',
+                                       '$80K - $120K', '$120K +', 'Unknown'], n),
+        'Card_Category': rng.choice(['Blue', 'Silver', 'Gold', 'Platinum'], n),
+        'Months_on_book': rng.integers(13, 57, n),
+        'Total_Relationship_Count': rng.integers(1, 7, n),
+        'Months_Inactive_12_mon': rng.integers(0, 7, n),
+        'Contacts_Count_12_mon': rng.integers(0, 7, n),
+        'Credit_Limit': np.round(rng.uniform(1438.3, 34516.0, n), 1),
+        'Total_Revolving_Bal': rng.integers(0, 2518, n),
+        'Avg_Open_To_Buy': np.round(rng.uniform(3.0, 34516.0, n), 1),
+        'Total_Amt_Chng_Q4_Q1': np.round(rng.uniform(0.0, 3.4, n), 3),
+        'Total_Trans_Amt': rng.integers(510, 18485, n),
+        'Total_Trans_Ct': rng.integers(10, 140, n),
+        'Total_Ct_Chng_Q4_Q1': np.round(rng.uniform(0.0, 3.7, n), 3),
+        'Avg_Utilization_Ratio': np.round(rng.uniform(0.0, 1.0, n), 3),
+        naive_bayes + '1': rng.random(n),
+        naive_bayes + '2': rng.random(n),
+    })
@@ -0,0 +1,73 @@
+"""Closed-loop HTTP load test for /predict: requests per second and tail
+latency, to compare the Flask and ASGI servers under the same load.
+
+    python main.py                                   # Flask on :5000
+    uvicorn asgi:app --port 8000                     # ASGI on :8000
+    python -m benchmarks.load_test --url http://localhost:5000 --url http://localhost:8000
+"""
+import argparse
+import json
+import threading
+import time
+from http.client import HTTPConnection
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from benchmarks.data import make_customers
+
+
+def client_loop(url, bodies, stop_at, latencies, errors):
+    parts = urlsplit(url)
+    conn = HTTPConnection(parts.hostname, parts.port, timeout=30)
+    i = 0
+    while time.perf_counter() < stop_at:
+        body = bodies[i % len(bodies)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            conn.request('POST', '/predict', body=body, headers={'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+                continue
+        except Exception as e:
+            errors.append(str(e))
+            conn.close()
+            conn = HTTPConnection(parts.hostname, parts.port, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+
+
+def run(url, concurrency, duration, bodies):
+    latencies, errors = [], []
+    stop_at = time.perf_counter() + duration
+    threads = [
+        threading.Thread(target=client_loop, args=(url, bodies, stop_at, latencies, errors))
+        for _ in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    ms = np.array(latencies) * 1000
+    if len(ms) == 0:
+        print(f"{url:<28} no successful requests, {len(errors)} errors")
+        return
+    print(f"{url:<28} {len(ms) / duration:9.1f} req/s  p50 {np.percentile(ms, 50):7.2f} ms  "
+          f"p95 {np.percentile(ms, 95):7.2f} ms  p99 {np.percentile(ms, 99):7.2f} ms  errors {len(errors)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', action='append', required=True, help="server base URL, repeatable")
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=20.0)
+    args = parser.parse_args()
+
+    bodies = [json.dumps(customer) for customer in make_customers(1000)]
+    for url in args.url:
+        run(url, args.concurrency, args.duration, bodies)
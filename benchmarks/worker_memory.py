@@ -0,0 +1,54 @@
+"""Memory per process for a pre-fork server: RSS, PSS (RSS with shared pages
+split across the processes sharing them) and USS (pages only this process
+holds). A low USS per worker means the model and reference are shared.
+
+    gunicorn -c gunicorn.conf.py main:app
+    python -m benchmarks.worker_memory --pidfile gunicorn.pid
+"""
+import argparse
+import os
+
+
+def smaps_rollup(pid):
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(':') and parts[1].isdigit():
+                fields[parts[0][:-1]] = int(parts[1])
+    return {
+        'rss': fields.get('Rss', 0),
+        'pss': fields.get('Pss', 0),
+        'uss': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0),
+    }
+
+
+def children(pid):
+    path = f"/proc/{pid}/task/{pid}/children"
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [int(child) for child in f.read().split()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pidfile', default='gunicorn.pid')
+    parser.add_argument('--pid', type=int, default=None, help="master pid, instead of --pidfile")
+    args = parser.parse_args()
+
+    if args.pid is None:
+        with open(args.pidfile) as f:
+            args.pid = int(f.read().strip())
+
+    rows = [('master', args.pid)] + [('worker', pid) for pid in children(args.pid)]
+    print(f"{'process':<8} {'pid':>8} {'RSS MiB':>9} {'PSS MiB':>9} {'USS MiB':>9}")
+    totals = {'rss': 0, 'pss': 0, 'uss': 0}
+    for role, pid in rows:
+        usage = smaps_rollup(pid)
+        for key in totals:
+            totals[key] += usage[key]
+        print(f"{role:<8} {pid:>8} {usage['rss'] / 1024:9.1f} {usage['pss'] / 1024:9.1f} {usage['uss'] / 1024:9.1f}")
+    workers = max(len(rows) - 1, 1)
+    print(f"{'total':<8} {'':>8} {totals['rss'] / 1024:9.1f} {totals['pss'] / 1024:9.1f} {totals['uss'] / 1024:9.1f}")
+    print(f"PSS per worker (total / workers): {totals['pss'] / 1024 / workers:.1f} MiB")
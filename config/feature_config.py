@@ -0,0 +1,97 @@
+##############################FEATURES####################################
+
+# Define all feature columns in the correct order
+FEATURE_COLUMNS = [
+    "Contacts_Count_12_mon",
+    "Months_Inactive_12_mon",
+    "Education_Level_Doctorate",
+    "Income_Category_Less than $40K",
+    "Marital_Status_Single",
+    "Dependent_count",
+    "Customer_Age",
+    "Months_on_book",
+    "Education_Level_Post-Graduate",
+    "Card_Category_Platinum",
+    "Education_Level_Unknown",
+    "Marital_Status_Unknown",
+    "Income_Category_Unknown",
+    "Card_Category_Gold",
+    "Avg_Open_To_Buy",
+    "Education_Level_Uneducated",
+    "Income_Category_$80K - $120K",
+    "Card_Category_Silver",
+    "Education_Level_Graduate",
+    "Income_Category_$40K - $60K",
+    "Education_Level_High School",
+    "Marital_Status_Married",
+    "Credit_Limit",
+    "Income_Category_$60K - $80K",
+    "Gender",
+    "Total_Amt_Chng_Q4_Q1",
+    "Total_Relationship_Count",
+    "Total_Trans_Amt",
+    "Avg_Utilization_Ratio",
+    "Total_Revolving_Bal",
+    "Total_Ct_Chng_Q4_Q1",
+    "Total_Trans_Ct"
+]
+
+LABEL_COLUMN = "Attrition_Flag"
+
+ENTITY_COLUMN = "CLIENTNUM"
+
+# Source-table columns preprocessing reads (entity id, label, raw features)
+RAW_COLUMNS = [
+    "CLIENTNUM",
+    "Attrition_Flag",
+    "Customer_Age",
+    "Gender",
+    "Dependent_count",
+    "Education_Level",
+    "Marital_Status",
+    "Income_Category",
+    "Card_Category",
+    "Months_on_book",
+    "Total_Relationship_Count",
+    "Months_Inactive_12_mon",
+    "Contacts_Count_12_mon",
+    "Credit_Limit",
+    "Total_Revolving_Bal",
+    "Avg_Open_To_Buy",
+    "Total_Amt_Chng_Q4_Q1",
+    "Total_Trans_Amt",
+    "Total_Trans_Ct",
+    "Total_Ct_Chng_Q4_Q1",
+    "Avg_Utilization_Ratio"
+]
+
+# Source columns by how the feature transformer encodes them. Numeric
+# columns keep their value (dtype as in the source table), binary columns
+# become 1 for the listed value, categorical columns are one-hot encoded.
+NUMERIC_COLUMNS = {
+    "Customer_Age": "int64",
+    "Dependent_count": "int64",
+    "Months_on_book": "int64",
+    "Total_Relationship_Count": "int64",
+    "Months_Inactive_12_mon": "int64",
+    "Contacts_Count_12_mon": "int64",
+    "Credit_Limit": "float64",
+    "Total_Revolving_Bal": "int64",
+    "Avg_Open_To_Buy": "float64",
+    "Total_Amt_Chng_Q4_Q1": "float64",
+    "Total_Trans_Amt": "int64",
+    "Total_Trans_Ct": "int64",
+    "Total_Ct_Chng_Q4_Q1": "float64",
+    "Avg_Utilization_Ratio": "float64"
+}
+
+BINARY_COLUMNS = {
+    "Gender": "M"
+}
+
+CATEGORICAL_COLUMNS = [
+    "Education_Level",
+    "Marital_Status",
+    "Income_Category",
+    "Card_Category"
+]
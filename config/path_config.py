@@ -7,6 +7,26 @@ TRAIN_PATH = os.path.join(RAW_DIR,'train_data.csv')
 TEST_PATH = os.path.join(RAW_DIR,'test_data.csv')
 
 
+# Parquet datasets (one part file per written chunk), the default
+# interchange between ingestion, preprocessing and training
+ARTIFACT_FORMAT = os.getenv('ARTIFACT_FORMAT', 'parquet')
+TRAIN_DATASET = os.path.join(RAW_DIR,'train')
+TEST_DATASET = os.path.join(RAW_DIR,'test')
+
 PROCESSED_DIR = "artifacts/processed"
+PROCESSED_FEATURES = os.path.join(PROCESSED_DIR,'features')
+# Fitted encoding (vocabularies, column order, dtypes) shared by training and serving
+FEATURE_TRANSFORMER_PATH = os.path.join(PROCESSED_DIR,'feature_transformer.json')
+
+MODEL_PATH = "artifacts/models/"
+
+REFERENCE_DIR = "artifacts/reference"
+
+MODEL_REGISTRY_DIR = "artifacts/registry"
+
+DATASET_CACHE_DIR = "artifacts/lgb_dataset"
 
-MODEL_PATH = "artifacts/models/"
\ No newline at end of file
+# Rows changed since the last run (incremental mode) and the high-water mark
+DELTA_PATH = os.path.join(RAW_DIR,'delta_data.csv')
+DELTA_DATASET = os.path.join(RAW_DIR,'delta')
+INCREMENTAL_STATE_PATH = "artifacts/incremental_state.json"
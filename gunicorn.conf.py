@@ -0,0 +1,44 @@
+"""Pre-fork serving for the churn service.
+
+    gunicorn -c gunicorn.conf.py main:app
+    gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi:app
+
+With preload_app the master imports main.py and finishes startup (model,
+scaler, memory-mapped drift reference) before forking, so workers share
+those pages copy-on-write instead of each loading its own copy.
+`kill -HUP <master pid>` reloads the model and reference in the master and
+then replaces every worker, which is how a new model version is rolled out.
+"""
+import gc
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('GUNICORN_WORKERS', 4))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+pidfile = os.getenv('GUNICORN_PIDFILE', 'gunicorn.pid')
+preload_app = True
+
+
+def when_ready(server):
+    import main
+
+    main.wait_until_ready()
+    # Keep the cyclic GC from touching (and un-sharing) the loaded objects
+    gc.freeze()
+    server.log.info("Service state loaded in master: %s", main.startup_state['timings'])
+
+
+def post_fork(server, worker):
+    import main
+
+    main.after_fork()
+
+
+def on_reload(server):
+    import main
+
+    server.log.info("Reloading model and drift reference before replacing workers")
+    gc.unfreeze()
+    main.reload_service()
+    gc.collect()
+    gc.freeze()
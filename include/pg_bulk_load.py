@@ -0,0 +1,472 @@
+"""Streaming CSV -> PostgreSQL bulk loads through COPY FROM STDIN.
+
+Used by dags/s3_etl_to_psql.py. Only needs psycopg2 and pandas, so the
+loader can be run and benchmarked outside Airflow.
+
+copy_csv_stream replaces a whole table from one stream. The partitioned
+loader (plan_partitions / prepare_staging / copy_partition /
+reconcile_partitions / swap_staging) appends many streams in parallel into
+a staging table, each tagged with its partition's source key so a retried
+partition replaces its own rows instead of adding them twice, and swaps
+the staging table in once its row counts reconcile.
+"""
+import csv
+import hashlib
+import io
+import logging
+import time
+
+import pandas as pd
+from psycopg2 import sql
+
+logger = logging.getLogger(__name__)
+
+# Rows read ahead of the COPY to infer column types
+SAMPLE_ROWS = 10000
+# Bytes handed to COPY per read from the source stream
+COPY_CHUNK_BYTES = 1 << 20
+
+PG_TYPES = {'i': 'BIGINT', 'u': 'BIGINT', 'f': 'DOUBLE PRECISION', 'b': 'BOOLEAN'}
+
+# PostgreSQL truncates identifiers to 63 bytes
+MAX_IDENTIFIER_BYTES = 63
+
+# Objects larger than this are split into byte ranges loaded by separate tasks
+SPLIT_BYTES = 64 << 20
+# Column holding the partition a row was loaded from
+SOURCE_KEY_COLUMN = "_source_key"
+# Session setting the source key column defaults to during a partition's COPY
+SOURCE_KEY_SETTING = "ingest.source_key"
+
+
+class PrefixedStream:
+    """File-like object returning `prefix` and then the rest of `stream`"""
+
+    def __init__(self, prefix, stream):
+        self.prefix = prefix
+        self.stream = stream
+
+    def read(self, size=-1):
+        if self.prefix:
+            if size is None or size < 0:
+                data, self.prefix = self.prefix + self.stream.read(), b""
+                return data
+            data, self.prefix = self.prefix[:size], self.prefix[size:]
+            return data
+        return self.stream.read(size)
+
+
+class LineRangeStream:
+    """File-like object over the CSV lines that start in bytes [start, end)
+    of an object.
+
+    `stream` has to begin at byte max(start - 1, 0) (an S3 ranged GET). A
+    line belongs to the range it starts in: a range drops the rest of the
+    line it opens in and reads past `end` to finish its last one, so every
+    line of the object is loaded by exactly one range.
+    """
+
+    def __init__(self, stream, start, end, chunk_bytes=1 << 16):
+        self.stream = stream
+        self.end = end
+        self.chunk_bytes = chunk_bytes
+        # Offset in the object of the next byte read from `stream`
+        self.position = max(start - 1, 0)
+        self.pending = b""
+        self.buffer = b""
+        self.finished = False
+        if start > 0:
+            self._skip_partial_line()
+
+    def _raw(self):
+        if self.pending:
+            data, self.pending = self.pending, b""
+            return data
+        return self.stream.read(self.chunk_bytes)
+
+    def _skip_partial_line(self):
+        while True:
+            chunk = self._raw()
+            if not chunk:
+                self.finished = True
+                return
+            newline = chunk.find(b"\n")
+            if newline >= 0:
+                self.position += newline + 1
+                self.pending = chunk[newline + 1:]
+                break
+            self.position += len(chunk)
+        # No line starts inside the range
+        if self.position >= self.end:
+            self.finished = True
+
+    def _next_chunk(self):
+        chunk = self._raw()
+        if not chunk:
+            self.finished = True
+            return b""
+        # Stop at the end of the line holding the range's last byte
+        newline = chunk.find(b"\n", max(self.end - 1 - self.position, 0)) if self.position + len(chunk) >= self.end else -1
+        if newline >= 0:
+            self.finished = True
+            return chunk[:newline + 1]
+        self.position += len(chunk)
+        return chunk
+
+    def read(self, size=-1):
+        while not self.finished and (size is None or size < 0 or len(self.buffer) < size):
+            self.buffer += self._next_chunk()
+        if size is None or size < 0:
+            size = len(self.buffer)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+
+def read_sample(stream, sample_rows=SAMPLE_ROWS, chunk_bytes=1 << 16):
+    """Bytes read from the head of `stream` holding at least `sample_rows`
+    complete lines (or the whole stream if it is shorter)"""
+    sample = b""
+    while sample.count(b"\n") <= sample_rows:
+        chunk = stream.read(chunk_bytes)
+        if not chunk:
+            break
+        sample += chunk
+    return sample
+
+
+def pg_identifier(column):
+    """`column`, or for names PostgreSQL would truncate (and could collide,
+    like the two Naive_Bayes_Classifier_... columns) a 63-byte prefix
+    ending in a hash of the full name"""
+    if len(column.encode()) <= MAX_IDENTIFIER_BYTES:
+        return column
+    digest = hashlib.sha1(column.encode()).hexdigest()[:8]
+    prefix = column.encode()[:MAX_IDENTIFIER_BYTES - len(digest) - 1].decode(errors="ignore")
+    return f"{prefix}_{digest}"
+
+
+def infer_columns(sample):
+    """[(column, postgres type)] from the complete lines of a CSV sample"""
+    complete = sample[:sample.rfind(b"\n") + 1] or sample
+    df = pd.read_csv(io.BytesIO(complete))
+    return [(pg_identifier(column), PG_TYPES.get(dtype.kind, 'TEXT')) for column, dtype in df.dtypes.items()]
+
+
+def csv_header(sample):
+    """Column names (as created in PostgreSQL) from the first line of a CSV sample"""
+    first_line = sample.split(b"\n", 1)[0].decode().rstrip("\r")
+    return [pg_identifier(column) for column in next(csv.reader([first_line]))]
+
+
+def copy_csv_stream(conn, stream, table, chunk_bytes=COPY_CHUNK_BYTES, sample_rows=SAMPLE_ROWS):
+    """Load a CSV byte stream (with a header row) into `table`.
+
+    The rows are COPYed into `<table>__staging`, then the old table is
+    dropped and the staging table renamed, all in one transaction: readers
+    see either the previous table or the complete new one. Returns
+    (rows, seconds).
+    """
+    start = time.perf_counter()
+    sample = read_sample(stream, sample_rows)
+    columns = infer_columns(sample)
+    staging = staging_table(table)
+
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier(staging)))
+            cursor.execute(sql.SQL("CREATE TABLE {} ({})").format(
+                sql.Identifier(staging),
+                sql.SQL(", ").join(
+                    sql.SQL("{} {}").format(sql.Identifier(column), sql.SQL(pg_type))
+                    for column, pg_type in columns
+                ),
+            ))
+            cursor.copy_expert(
+                sql.SQL("COPY {} FROM STDIN WITH (FORMAT csv, HEADER true)").format(sql.Identifier(staging)).as_string(conn),
+                PrefixedStream(sample, stream),
+                size=chunk_bytes,
+            )
+            rows = cursor.rowcount
+
+            cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(sql.Identifier(table)))
+            cursor.execute(sql.SQL("ALTER TABLE {} RENAME TO {}").format(sql.Identifier(staging), sql.Identifier(table)))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    elapsed = time.perf_counter() - start
+    logger.info(f"COPY loaded {rows} rows into {table} in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):.0f} rows/s)")
+    return rows, elapsed
+
+
+def to_sql_load(engine, source, table):
+    """The original loader: whole file into pandas, then DataFrame.to_sql.
+    Kept for comparison. Returns (rows, seconds)."""
+    start = time.perf_counter()
+    df = pd.read_csv(source)
+    df.to_sql(name=table, con=engine, if_exists="replace", index=False)
+    elapsed = time.perf_counter() - start
+    logger.info(f"to_sql loaded {len(df)} rows into {table} in {elapsed:.2f}s ({len(df) / max(elapsed, 1e-9):.0f} rows/s)")
+    return len(df), elapsed
+
+
+def plan_partitions(objects, split_bytes=SPLIT_BYTES):
+    """Byte-range partitions of the objects to load.
+
+    `objects` are dicts with the object's key, size, etag and CSV header
+    columns. Objects up to `split_bytes` are one partition, larger ones
+    are cut into ranges of `split_bytes`. A partition's source key (object
+    key plus range) is what makes its load idempotent.
+    """
+    partitions = []
+    for obj in sorted(objects, key=lambda obj: obj["key"]):
+        for start in range(0, max(obj["size"], 1), split_bytes):
+            end = min(start + split_bytes, obj["size"])
+            partitions.append({
+                "object_key": obj["key"],
+                "etag": obj["etag"],
+                "start": start,
+                "end": end,
+                "source_key": f"{obj['key']}:{start}-{end}",
+                "columns": obj["columns"],
+                # Only the first range holds the header row
+                "header": start == 0,
+            })
+    return partitions
+
+
+def staging_table(table):
+    return f"{table}__staging"
+
+
+def ledger_table(table):
+    return f"{table}__ledger"
+
+
+def index_names(table):
+    """Names of the indexes of a partitioned table and its ledger, renamed
+    along with the tables when staging is swapped in"""
+    return [f"{table}__source_key", f"{ledger_table(table)}_pkey"]
+
+
+def table_columns(conn, table):
+    """Column names of `table`, None if it does not exist"""
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT column_name FROM information_schema.columns "
+            "WHERE table_schema = current_schema() AND table_name = %s ORDER BY ordinal_position",
+            [table],
+        )
+        columns = [row[0] for row in cursor.fetchall()]
+    return columns or None
+
+
+def ensure_partitioned_table(conn, table, columns):
+    """Create `table` (with the source key column) and its ledger if needed.
+
+    The source key column defaults to a session setting that copy_partition
+    sets for the duration of its transaction, so rows COPYed in get their
+    partition's key without a second pass. Raises ValueError for an
+    existing table without a source key column.
+    """
+    existing = table_columns(conn, table)
+    if existing is not None and SOURCE_KEY_COLUMN not in existing:
+        raise ValueError(f"{table} has no {SOURCE_KEY_COLUMN} column")
+    source_key_index, ledger_key = index_names(table)
+    try:
+        with conn.cursor() as cursor:
+            if existing is None:
+                cursor.execute(sql.SQL("CREATE TABLE {} ({}, {} TEXT NOT NULL DEFAULT current_setting({}))").format(
+                    sql.Identifier(table),
+                    sql.SQL(", ").join(
+                        sql.SQL("{} {}").format(sql.Identifier(column), sql.SQL(pg_type))
+                        for column, pg_type in columns
+                    ),
+                    sql.Identifier(SOURCE_KEY_COLUMN),
+                    sql.Literal(SOURCE_KEY_SETTING),
+                ))
+                cursor.execute(sql.SQL("CREATE INDEX {} ON {} ({})").format(
+                    sql.Identifier(source_key_index), sql.Identifier(table), sql.Identifier(SOURCE_KEY_COLUMN),
+                ))
+
+            cursor.execute(sql.SQL(
+                "CREATE TABLE IF NOT EXISTS {} ("
+                "source_key TEXT, object_key TEXT NOT NULL, etag TEXT, "
+                "rows BIGINT NOT NULL, loaded_at TIMESTAMPTZ NOT NULL DEFAULT now(), "
+                "CONSTRAINT {} PRIMARY KEY (source_key))"
+            ).format(sql.Identifier(ledger_table(table)), sql.Identifier(ledger_key)))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return table_columns(conn, table)
+
+
+def prepare_staging(conn, table, columns, partitions):
+    """Recreate the staging table of `table` for a load of `partitions`.
+
+    Partitions whose object has the same etag as at their last load are
+    copied over from the live table with their ledger entries, so only new
+    and changed partitions are read from S3 again; partitions no longer
+    planned are simply not carried over. The live table is not touched.
+    Returns the staging table's columns.
+    """
+    staging = staging_table(table)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}, {}").format(
+                sql.Identifier(staging), sql.Identifier(ledger_table(staging)),
+            ))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    staging_columns = ensure_partitioned_table(conn, staging, columns)
+
+    # Carry partitions over only from a partitioned table of the same layout
+    live_columns = table_columns(conn, table)
+    if live_columns is None or sorted(live_columns) != sorted(staging_columns) or table_columns(conn, ledger_table(table)) is None:
+        return staging_columns
+
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                sql.SQL(
+                    "INSERT INTO {} (source_key, object_key, etag, rows, loaded_at) "
+                    "SELECT source_key, object_key, etag, rows, loaded_at FROM {} "
+                    "WHERE (source_key, etag) IN (SELECT * FROM unnest(%s::text[], %s::text[]))"
+                ).format(sql.Identifier(ledger_table(staging)), sql.Identifier(ledger_table(table))),
+                [[partition["source_key"] for partition in partitions], [partition["etag"] for partition in partitions]],
+            )
+            cursor.execute(
+                sql.SQL("INSERT INTO {0} ({1}) SELECT {1} FROM {2} WHERE {3} IN (SELECT source_key FROM {4})").format(
+                    sql.Identifier(staging),
+                    sql.SQL(", ").join(sql.Identifier(column) for column in staging_columns),
+                    sql.Identifier(table),
+                    sql.Identifier(SOURCE_KEY_COLUMN),
+                    sql.Identifier(ledger_table(staging)),
+                ),
+            )
+            carried = cursor.rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    if carried:
+        logger.info(f"Carried {carried} rows of unchanged partitions from {table} over to {staging}")
+    return staging_columns
+
+
+def loaded_etag(conn, table, source_key):
+    """Etag of the object a partition was last loaded from, None if it never was"""
+    with conn.cursor() as cursor:
+        cursor.execute(
+            sql.SQL("SELECT etag FROM {} WHERE source_key = %s").format(sql.Identifier(ledger_table(table))),
+            [source_key],
+        )
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def copy_partition(conn, stream, table, partition, chunk_bytes=COPY_CHUNK_BYTES):
+    """Replace the rows of one partition with the lines of `stream`.
+
+    The delete of the partition's previous rows, the COPY and the ledger
+    entry are one transaction, so a partition retried after a failure (or
+    loaded again) never leaves duplicates. Returns (rows, seconds).
+    """
+    start = time.perf_counter()
+    source_key = partition["source_key"]
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT set_config(%s, %s, true)", [SOURCE_KEY_SETTING, source_key])
+            cursor.execute(
+                sql.SQL("DELETE FROM {} WHERE {} = %s").format(sql.Identifier(table), sql.Identifier(SOURCE_KEY_COLUMN)),
+                [source_key],
+            )
+            cursor.copy_expert(
+                sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv, HEADER {})").format(
+                    sql.Identifier(table),
+                    sql.SQL(", ").join(sql.Identifier(column) for column in partition["columns"]),
+                    sql.SQL("true" if partition["header"] else "false"),
+                ).as_string(conn),
+                stream,
+                size=chunk_bytes,
+            )
+            rows = cursor.rowcount
+            cursor.execute(
+                sql.SQL(
+                    "INSERT INTO {} (source_key, object_key, etag, rows) VALUES (%s, %s, %s, %s) "
+                    "ON CONFLICT (source_key) DO UPDATE SET etag = EXCLUDED.etag, rows = EXCLUDED.rows, loaded_at = now()"
+                ).format(sql.Identifier(ledger_table(table))),
+                [source_key, partition["object_key"], partition["etag"], rows],
+            )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    elapsed = time.perf_counter() - start
+    logger.info(f"COPY loaded {rows} rows of {source_key} into {table} in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):.0f} rows/s)")
+    return rows, elapsed
+
+
+def reconcile_partitions(conn, table, source_keys):
+    """Compare the rows in `table` per partition against the ledger.
+
+    Raises ValueError when a planned partition was never loaded, when its
+    row count differs from what its COPY reported, or when the table holds
+    rows of partitions that were not planned.
+    """
+    source_keys = list(source_keys)
+    planned = set(source_keys)
+    with conn.cursor() as cursor:
+        cursor.execute(
+            sql.SQL("SELECT source_key, rows FROM {} WHERE source_key = ANY(%s)").format(sql.Identifier(ledger_table(table))),
+            [source_keys],
+        )
+        ledger = dict(cursor.fetchall())
+        cursor.execute(
+            sql.SQL("SELECT {0}, count(*) FROM {1} GROUP BY {0}").format(sql.Identifier(SOURCE_KEY_COLUMN), sql.Identifier(table)),
+        )
+        counts = dict(cursor.fetchall())
+
+    missing = [key for key in source_keys if key not in ledger]
+    mismatched = {key: (ledger[key], counts.get(key, 0)) for key in ledger if ledger[key] != counts.get(key, 0)}
+    unplanned = {key: count for key, count in counts.items() if key not in planned}
+    summary = {
+        "partitions": len(source_keys),
+        "rows": sum(counts.get(key, 0) for key in source_keys),
+        "missing": missing,
+        "mismatched": mismatched,
+        "unplanned": unplanned,
+    }
+    if missing or mismatched or unplanned:
+        raise ValueError(f"Row counts of {table} do not reconcile: {summary}")
+    logger.info(f"{table}: {summary['rows']} rows in {summary['partitions']} partitions match the ledger")
+    return summary
+
+
+def swap_staging(conn, table):
+    """Replace `table` and its ledger with the staging ones.
+
+    The old tables are dropped and the staging tables and their indexes
+    renamed in one transaction: readers see either the previous load or
+    the complete new one.
+    """
+    staging = staging_table(table)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}, {}").format(
+                sql.Identifier(table), sql.Identifier(ledger_table(table)),
+            ))
+            for old, new in ((staging, table), (ledger_table(staging), ledger_table(table))):
+                cursor.execute(sql.SQL("ALTER TABLE {} RENAME TO {}").format(sql.Identifier(old), sql.Identifier(new)))
+            for old, new in zip(index_names(staging), index_names(table)):
+                cursor.execute(sql.SQL("ALTER INDEX {} RENAME TO {}").format(sql.Identifier(old), sql.Identifier(new)))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    logger.info(f"Swapped {staging} in as {table}")
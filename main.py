@@ -1,14 +1,27 @@
 from flask import Flask, render_template, request, jsonify
 import pickle
+import hashlib
+import json
 import numpy as np
-import pandas as pd
-import dvc.api
 import os
+import threading
+import time
+from collections import namedtuple
+import warnings
 from src.logger import get_logger
 from src.feature_store import RedisFeatureStore
+from src.feature_transformer import FeatureTransformer
+from src.feature_encoder import FORM_FIELDS
+from src.reference_snapshot import load_reference_snapshot
+from src.drift_monitor import DriftMonitor
+from src.tree_inference import build_predictor
+from src.micro_batcher import MicroBatcher
+from src.entity_cache import TTLCache
+from src.model_registry import RegistryWatcher, load_registered_model, load_registered_transformer, registered_meta
+from config.path_config import REFERENCE_DIR, MODEL_REGISTRY_DIR, FEATURE_TRANSFORMER_PATH
+from config.feature_config import FEATURE_COLUMNS
 from sklearn.preprocessing import StandardScaler
-from alibi_detect.cd import KSDrift
-from prometheus_client import start_http_server, Counter
+from prometheus_client import start_http_server, Counter, Gauge, Histogram
 
 logger = get_logger(__name__)
 
@@ -16,66 +29,142 @@ app = Flask(__name__)
 
 prediction_count = Counter('prediction_count' , " Number of prediction count" )
 drift_count = Counter('drift_count' , "Numer of times data drift is detected")
+drift_detected = Gauge('drift_detected' , "1 if the latest drift window was flagged as drifted")
+feature_drift_p_value = Gauge('feature_drift_p_value' , "KS p-value of each feature in the latest drift window" , ['feature'])
+drift_window_rows = Gauge('drift_window_rows' , "Rows in the latest drift window")
+micro_batch_size = Histogram('micro_batch_size' , "Rows per coalesced /predict model call" , buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256))
+micro_batch_queue_seconds = Histogram('micro_batch_queue_seconds' , "Time a /predict row waited before its batch was scored" , buckets=(0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1))
+startup_stage_seconds = Gauge('startup_stage_seconds' , "Cold-start time of each startup stage in seconds" , ['stage'])
+entity_cache_lookups = Counter('entity_cache_lookups' , "Entity cache lookups by cache and result" , ['cache' , 'result'])
+entity_cache_hit_ratio = Gauge('entity_cache_hit_ratio' , "Hit ratio of each entity cache since startup" , ['cache'])
 
 # Global variable to store the model
 model = None
+# Content hash of the loaded model file; cached entity results are keyed by it
+model_version = None
 
-# Define all feature columns in the correct order
-FEATURE_COLUMNS = [
-    "Contacts_Count_12_mon",
-    "Months_Inactive_12_mon",
-    "Education_Level_Doctorate",
-    "Income_Category_Less than $40K",
-    "Marital_Status_Single",
-    "Dependent_count",
-    "Customer_Age",
-    "Months_on_book",
-    "Education_Level_Post-Graduate",
-    "Card_Category_Platinum",
-    "Education_Level_Unknown",
-    "Marital_Status_Unknown",
-    "Income_Category_Unknown",
-    "Card_Category_Gold",
-    "Avg_Open_To_Buy",
-    "Education_Level_Uneducated",
-    "Income_Category_$80K - $120K",
-    "Card_Category_Silver",
-    "Education_Level_Graduate",
-    "Income_Category_$40K - $60K",
-    "Education_Level_High School",
-    "Marital_Status_Married",
-    "Credit_Limit",
-    "Income_Category_$60K - $80K",
-    "Gender",
-    "Total_Amt_Chng_Q4_Q1",
-    "Total_Relationship_Count",
-    "Total_Trans_Amt",
-    "Avg_Utilization_Ratio",
-    "Total_Revolving_Bal",
-    "Total_Ct_Chng_Q4_Q1",
-    "Total_Trans_Ct"
-]
-
-feature_store = RedisFeatureStore()
+# predict_proba backend: booster (Booster.predict without the sklearn
+# wrapper), compiled (NumPy tree engine) or sklearn
+INFERENCE_BACKEND = os.getenv('INFERENCE_BACKEND', 'booster')
+predictor = None
+
+# Everything a request scores with, replaced as one object when a new model
+# goes live so a request never mixes two versions
+ServingBundle = namedtuple('ServingBundle', ['model', 'predictor', 'version', 'source', 'encoder'])
+serving = None
+
+# Local model registry (see src/model_registry.py); its CURRENT pointer is
+# polled every MODEL_REGISTRY_POLL_SECONDS and a new version is swapped in
+# without a restart. An empty registry falls back to DVC / model.pkl.
+MODEL_REGISTRY = os.getenv('MODEL_REGISTRY_DIR', MODEL_REGISTRY_DIR)
+MODEL_REGISTRY_POLL_SECONDS = float(os.getenv('MODEL_REGISTRY_POLL_SECONDS', 5))
+registry_watcher = None
+
+# Concurrent /predict calls are coalesced into one model call of up to
+# MICRO_BATCH_MAX_SIZE rows, waiting at most MICRO_BATCH_MAX_WAIT_MS for
+# the batch to fill. A max size of 0 or 1 scores every request on its own.
+MICRO_BATCH_MAX_SIZE = int(os.getenv('MICRO_BATCH_MAX_SIZE', 0))
+MICRO_BATCH_MAX_WAIT_MS = float(os.getenv('MICRO_BATCH_MAX_WAIT_MS', 2))
+micro_batcher = None
+
+# Form fields -> float32 rows in FEATURE_COLUMNS order, built from the
+# feature transformer the live model was trained with
+encoder = None
+warnings.filterwarnings('ignore', message='X does not have valid feature names')
+
+# Startup runs in a background thread so /health answers immediately;
+# these flags and timings are what /health reports while it runs
+startup_state = {
+    'model_ready': False,
+    'drift_ready': False,
+    'started': False,
+    'finished': False,
+    'errors': {},
+    'timings': {},
+}
+startup_lock = threading.Lock()
+startup_done = threading.Event()
+
+# /predict/entity reads stored features by CLIENTNUM. Feature rows and
+# predictions are cached per (model_version, entity id), so loading a new
+# model never serves results of the previous one.
+ENTITY_CACHE_SIZE = int(os.getenv('ENTITY_CACHE_SIZE', 10000))
+ENTITY_FEATURE_TTL = float(os.getenv('ENTITY_FEATURE_TTL', 300))
+ENTITY_PREDICTION_TTL = float(os.getenv('ENTITY_PREDICTION_TTL', 60))
+
+def cache_lookup_recorder(name):
+    def record(hits, misses):
+        entity_cache_lookups.labels(cache=name, result='hit').inc(hits)
+        entity_cache_lookups.labels(cache=name, result='miss').inc(misses)
+        entity_cache_hit_ratio.labels(cache=name).set(entity_caches[name].hit_ratio)
+    return record
+
+entity_caches = {
+    'features': TTLCache(ENTITY_CACHE_SIZE, ENTITY_FEATURE_TTL, on_lookup=cache_lookup_recorder('features')),
+    'predictions': TTLCache(ENTITY_CACHE_SIZE, ENTITY_PREDICTION_TTL, on_lookup=cache_lookup_recorder('predictions')),
+}
+
+feature_store = None
 scaler = StandardScaler()
+historical_data = None
+ksd = None
+drift_monitor = None
+# Reference snapshot the drift detector was built from, None when it was
+# fitted on the feature store
+reference_version = None
+
+# Drift is tested over sliding windows of recent rows in the background
+DRIFT_WINDOW_SIZE = int(os.getenv('DRIFT_WINDOW_SIZE', 1000))
+DRIFT_MIN_ROWS = int(os.getenv('DRIFT_MIN_ROWS', 100))
+DRIFT_CHECK_EVERY = int(os.getenv('DRIFT_CHECK_EVERY', 250))
+DRIFT_CHECK_INTERVAL = float(os.getenv('DRIFT_CHECK_INTERVAL', 30))
 
 def fit_scaler_on_ref_data():
-    entity_ids = feature_store.get_all_entity_ids()
-    all_features = feature_store.get_batch_features(entity_ids)
+    # Stream the store straight into a float32 matrix in FEATURE_COLUMNS order
+    _ , reference , _ = feature_store.export_matrix(FEATURE_COLUMNS , label_column=None)
 
-    all_features_df = pd.DataFrame.from_dict(all_features , orient='index')[FEATURE_COLUMNS]
+    scaler.fit(reference)
+    return scaler.transform(reference)
 
-    scaler.fit(all_features_df)
-    return scaler.transform(all_features_df)
+def init_drift_detector(reference_path=REFERENCE_DIR):
+    """Load the scaler and drift reference, from a snapshot when one exists,
+    otherwise by fitting on the feature store"""
+    global scaler, historical_data, ksd, drift_monitor, reference_version
+    from alibi_detect.cd import KSDrift
 
+    get_feature_store()
+    try:
+        # Memory-mapped reference: workers share it through the page cache
+        scaler , historical_data , meta = load_reference_snapshot(reference_path)
+        reference_version = meta['version']
+        logger.info(f"Loaded reference snapshot {meta['version']}")
+    except (FileNotFoundError , ValueError) as e:
+        logger.warning(f"No usable reference snapshot ({e}), fitting on the feature store")
+        historical_data = fit_scaler_on_ref_data()
+        reference_version = None
+    ksd = KSDrift(x_ref=historical_data , p_val=0.05)
 
-historical_data = fit_scaler_on_ref_data()
-ksd = KSDrift(x_ref=historical_data , p_val=0.05)
+    previous = drift_monitor
+    drift_monitor = DriftMonitor(
+        ksd,
+        n_features=len(FEATURE_COLUMNS),
+        transform=scaler.transform,
+        on_result=publish_drift_result,
+        window_size=DRIFT_WINDOW_SIZE,
+        min_rows=DRIFT_MIN_ROWS,
+        check_every=DRIFT_CHECK_EVERY,
+        interval=DRIFT_CHECK_INTERVAL,
+    ).start()
+    if previous is not None:
+        previous.stop()
+    return True
 
 def load_model_from_dvc():
     """Load model from DVC S3 storage"""
-    global model
+    global model, model_version
     try:
+        import dvc.api
+
         # Using dvc.api.read() to load directly from S3
         data = dvc.api.read(
             'model.pkl',
@@ -83,98 +172,280 @@ def load_model_from_dvc():
             mode='rb'
         )
         model = pickle.loads(data)
+        model_version = hashlib.sha256(data).hexdigest()[:12]
         print("✓ Model loaded successfully from DVC storage")
     except Exception as e:
         print(f"Warning: Could not load from DVC: {e}")
         # Fallback to local file
         if os.path.exists('model.pkl'):
             with open('model.pkl', 'rb') as f:
-                model = pickle.load(f)
+                data = f.read()
+            model = pickle.loads(data)
+            model_version = hashlib.sha256(data).hexdigest()[:12]
             print("✓ Model loaded from local file")
         else:
             print("✗ Model not found!")
+    return model is not None
 
-def prepare_features(form_data):
-    """Convert form data to model input with one-hot encoding"""
-    
-    # Initialize all features with 0
-    features = {col: 0 for col in FEATURE_COLUMNS}
-    
-    # Set numeric features directly
-    features['Contacts_Count_12_mon'] = int(form_data.get('contacts_count', 0))
-    features['Months_Inactive_12_mon'] = int(form_data.get('months_inactive', 0))
-    features['Dependent_count'] = int(form_data.get('dependent_count', 0))
-    features['Customer_Age'] = int(form_data.get('customer_age', 0))
-    features['Months_on_book'] = int(form_data.get('months_on_book', 0))
-    features['Avg_Open_To_Buy'] = float(form_data.get('avg_open_to_buy', 0))
-    features['Credit_Limit'] = float(form_data.get('credit_limit', 0))
-    features['Total_Amt_Chng_Q4_Q1'] = float(form_data.get('total_amt_chng', 0))
-    features['Total_Relationship_Count'] = int(form_data.get('total_relationship_count', 0))
-    features['Total_Trans_Amt'] = float(form_data.get('total_trans_amt', 0))
-    features['Avg_Utilization_Ratio'] = float(form_data.get('avg_utilization_ratio', 0))
-    features['Total_Revolving_Bal'] = float(form_data.get('total_revolving_bal', 0))
-    features['Total_Ct_Chng_Q4_Q1'] = float(form_data.get('total_ct_chng', 0))
-    features['Total_Trans_Ct'] = int(form_data.get('total_trans_ct', 0))
-    
-    # Gender: M=1, F=0
-    features['Gender'] = 1 if form_data.get('gender') == 'M' else 0
-    
-    # One-hot encode Education Level
-    education = form_data.get('education_level')
-    if education == 'Doctorate':
-        features['Education_Level_Doctorate'] = 1
-    elif education == 'Post-Graduate':
-        features['Education_Level_Post-Graduate'] = 1
-    elif education == 'Graduate':
-        features['Education_Level_Graduate'] = 1
-    elif education == 'High School':
-        features['Education_Level_High School'] = 1
-    elif education == 'Uneducated':
-        features['Education_Level_Uneducated'] = 1
-    elif education == 'Unknown':
-        features['Education_Level_Unknown'] = 1
-    
-    # One-hot encode Marital Status
-    marital = form_data.get('marital_status')
-    if marital == 'Single':
-        features['Marital_Status_Single'] = 1
-    elif marital == 'Married':
-        features['Marital_Status_Married'] = 1
-    elif marital == 'Unknown':
-        features['Marital_Status_Unknown'] = 1
-    
-    # One-hot encode Income Category
-    income = form_data.get('income_category')
-    if income == 'Less than $40K':
-        features['Income_Category_Less than $40K'] = 1
-    elif income == '$40K - $60K':
-        features['Income_Category_$40K - $60K'] = 1
-    elif income == '$60K - $80K':
-        features['Income_Category_$60K - $80K'] = 1
-    elif income == '$80K - $120K':
-        features['Income_Category_$80K - $120K'] = 1
-    elif income == 'Unknown':
-        features['Income_Category_Unknown'] = 1
-    
-    # One-hot encode Card Category
-    card = form_data.get('card_category')
-    if card == 'Platinum':
-        features['Card_Category_Platinum'] = 1
-    elif card == 'Gold':
-        features['Card_Category_Gold'] = 1
-    elif card == 'Silver':
-        features['Card_Category_Silver'] = 1
-    
-    return features
+def load_local_transformer():
+    """Transformer of the last local training run; models without one are
+    served with the encoding implied by FEATURE_COLUMNS"""
+    if os.path.exists(FEATURE_TRANSFORMER_PATH):
+        return FeatureTransformer.load(FEATURE_TRANSFORMER_PATH)
+    logger.warning(f"No feature transformer at {FEATURE_TRANSFORMER_PATH}, encoding by FEATURE_COLUMNS")
+    return FeatureTransformer.from_feature_columns(FEATURE_COLUMNS)
+
+def activate_model(loaded, version, source, transformer):
+    """Build the predictor and encoder for `loaded` and make them live in
+    one assignment"""
+    global model, model_version, predictor, serving, encoder
+    transformer.check_columns(FEATURE_COLUMNS)
+    bundle = ServingBundle(loaded, build_predictor(loaded, INFERENCE_BACKEND), version, source, transformer.encoder(FORM_FIELDS))
+    serving = bundle
+    model, model_version, predictor, encoder = bundle.model, bundle.version, bundle.predictor, bundle.encoder
+    # Entries of the previous model can no longer be hit, free them
+    for cache in entity_caches.values():
+        cache.clear()
+    logger.info(f"Serving model {version} from {source}")
+
+def swap_model(version):
+    """Make a registered model live together with the reference snapshot
+    it was registered with; requests already running finish on the bundle
+    they started with"""
+    loaded, meta = load_registered_model(MODEL_REGISTRY, version, FEATURE_COLUMNS)
+    transformer = load_registered_transformer(MODEL_REGISTRY, version, FEATURE_COLUMNS)
+    wanted_reference = meta.get('reference_version')
+    if wanted_reference and wanted_reference != reference_version:
+        startup_state['drift_ready'] = init_drift_detector(os.path.join(REFERENCE_DIR, wanted_reference))
+    activate_model(loaded, version, 'registry', transformer)
+
+def registry_reference_path():
+    """Reference snapshot the registry's current model was registered with,
+    the latest snapshot when the registry is empty or recorded none"""
+    try:
+        wanted_reference = registered_meta(MODEL_REGISTRY).get('reference_version')
+    except FileNotFoundError:
+        wanted_reference = None
+    return os.path.join(REFERENCE_DIR, wanted_reference) if wanted_reference else REFERENCE_DIR
+
+def load_drift_stage():
+    """Drift detector on the reference of the model being served, as
+    swap_model pairs them, so a rolled back model keeps its own scaler"""
+    return init_drift_detector(registry_reference_path())
+
+def load_model_stage():
+    """Serve the registry's current model, or the DVC / local model.pkl
+    while the registry is empty, and watch the registry for new versions"""
+    global registry_watcher
+    try:
+        loaded, meta = load_registered_model(MODEL_REGISTRY, columns=FEATURE_COLUMNS)
+        activate_model(loaded, meta['version'], 'registry', load_registered_transformer(MODEL_REGISTRY, meta['version'], FEATURE_COLUMNS))
+    except (FileNotFoundError, ValueError) as e:
+        logger.warning(f"Model registry not used ({e})")
+        if not load_model_from_dvc():
+            return False
+        activate_model(model, model_version, 'dvc', load_local_transformer())
+
+    if registry_watcher is None:
+        registry_watcher = RegistryWatcher(swap_model, MODEL_REGISTRY, MODEL_REGISTRY_POLL_SECONDS).start()
+    registry_watcher.version = model_version if serving.source == 'registry' else None
+    return True
+
+def run_startup_stage(name, ready_flag, fn):
+    """Run one startup stage, recording its duration and outcome"""
+    start = time.perf_counter()
+    try:
+        startup_state[ready_flag] = bool(fn())
+    except Exception as e:
+        logger.error(f"Startup stage {name} failed {e}")
+        startup_state['errors'][name] = str(e)
+    finally:
+        elapsed = time.perf_counter() - start
+        startup_state['timings'][name] = round(elapsed, 3)
+        startup_stage_seconds.labels(stage=name).set(elapsed)
+        logger.info(f"Startup stage {name} took {elapsed:.2f}s")
+
+def initialize_service():
+    """Load the model and the drift detector concurrently"""
+    start = time.perf_counter()
+    stages = [
+        threading.Thread(target=run_startup_stage, args=('model', 'model_ready', load_model_stage)),
+        threading.Thread(target=run_startup_stage, args=('drift', 'drift_ready', load_drift_stage)),
+    ]
+    for stage in stages:
+        stage.start()
+    for stage in stages:
+        stage.join()
+
+    elapsed = time.perf_counter() - start
+    startup_state['timings']['total'] = round(elapsed, 3)
+    startup_stage_seconds.labels(stage='total').set(elapsed)
+    startup_state['finished'] = True
+    startup_done.set()
+
+def start_background_initialization():
+    """Kick off startup once, without blocking the caller"""
+    with startup_lock:
+        if startup_state['started']:
+            return
+        startup_state['started'] = True
+    threading.Thread(target=initialize_service, name='startup', daemon=True).start()
+
+def wait_until_ready(timeout=None):
+    start_background_initialization()
+    return startup_done.wait(timeout)
+
+def reload_service():
+    """Reload the model and drift reference synchronously, e.g. in the
+    pre-fork master before it replaces its workers"""
+    run_startup_stage('model', 'model_ready', load_model_stage)
+    run_startup_stage('drift', 'drift_ready', load_drift_stage)
+
+def after_fork():
+    """Restart the background threads a forked worker does not inherit"""
+    if drift_monitor is not None:
+        drift_monitor.after_fork()
+    if micro_batcher is not None:
+        micro_batcher.after_fork()
+    if registry_watcher is not None:
+        registry_watcher.after_fork()
+
+def publish_drift_result(drift_response, n_rows):
+    """Export one drift window's result to Prometheus"""
+    is_drift = drift_response.get('is_drift' , None)
+
+    for feature, p_val in zip(FEATURE_COLUMNS, drift_response.get('p_val', [])):
+        feature_drift_p_value.labels(feature=feature).set(float(p_val))
+    drift_window_rows.set(n_rows)
+    drift_detected.set(1 if is_drift == 1 else 0)
+
+    if is_drift is not None and is_drift==1:
+        print("Drift Detected....")
+        logger.info("Drift Detected....")
+
+        drift_count.inc()
+
+def latest_drift():
+    """Drift flag of the most recent window, None before the first check"""
+    if drift_monitor is None or drift_monitor.last_result is None:
+        return None
+    return drift_monitor.last_result.get('is_drift') == 1
+
+def format_prediction(prediction, probability):
+    """Build the JSON response for one scored customer"""
+    return {
+        'prediction': int(prediction),
+        'attrition_probability': float(probability[1]),
+        'retention_probability': float(probability[0]),
+        'status': 'Attrited Customer' if prediction == 1 else 'Existing Customer',
+        'risk_level': 'High' if probability[1] > 0.7 else 'Medium' if probability[1] > 0.4 else 'Low'
+    }
+
+def score_features(features, bundle=None, record_drift=True):
+    """Buffer rows for drift and score them with one predict_proba call.
+
+    Rows read back from the feature store are the reference data, not live
+    traffic; they are scored with record_drift=False.
+    """
+    bundle = bundle or serving
+    ##### Data Drift Detection (buffered, tested in the background)
+    if record_drift and startup_state['drift_ready']:
+        drift_monitor.add(features)
+
+    # Single predict_proba pass, labels derived from the probabilities
+    probabilities = bundle.predictor.predict_proba(features)
+    predictions = bundle.model.classes_[np.argmax(probabilities, axis=1)]
+    prediction_count.inc(len(features))
+
+    return [
+        format_prediction(prediction, probability)
+        for prediction, probability in zip(predictions, probabilities)
+    ]
+
+def get_feature_store():
+    global feature_store
+    if feature_store is None:
+        feature_store = RedisFeatureStore()
+    return feature_store
+
+def lookup_entities(entity_ids, version):
+    """Deduplicated ids, their cached predictions and cached feature rows,
+    and the ids whose rows have to be read from the feature store"""
+    entity_ids = list(dict.fromkeys(str(entity_id) for entity_id in entity_ids))
+
+    cached = entity_caches['predictions'].get_many([(version, entity_id) for entity_id in entity_ids])
+    results = {entity_id: result for (_, entity_id), result in cached.items()}
+    pending = [entity_id for entity_id in entity_ids if entity_id not in results]
+
+    rows = {entity_id: row for (_, entity_id), row in entity_caches['features'].get_many([(version, entity_id) for entity_id in pending]).items()}
+    to_fetch = [entity_id for entity_id in pending if entity_id not in rows]
+    return entity_ids, results, rows, to_fetch
+
+def cache_entity_rows(version, found_ids, X):
+    fetched = dict(zip(found_ids, X))
+    entity_caches['features'].put_many(((version, entity_id), row) for entity_id, row in fetched.items())
+    return fetched
+
+def cache_entity_results(version, scored, predictions):
+    fresh = {
+        entity_id: dict(result, entity_id=entity_id)
+        for entity_id, result in zip(scored, predictions)
+    }
+    entity_caches['predictions'].put_many(((version, entity_id), result) for entity_id, result in fresh.items())
+    return fresh
+
+def entity_results(entity_ids, results):
+    """({entity_id: result} in request order, missing ids)"""
+    missing = [entity_id for entity_id in entity_ids if entity_id not in results]
+    return {entity_id: results[entity_id] for entity_id in entity_ids if entity_id in results}, missing
+
+def score_entities(entity_ids):
+    """Score customers by CLIENTNUM from their stored features.
+
+    Cached predictions are returned as is; the remaining entities are read
+    from the feature cache or, in one MGET, from the feature store and
+    scored in one model call. Returns ({entity_id: result}, missing ids).
+    """
+    bundle = serving
+    version = bundle.version
+    entity_ids, results, rows, to_fetch = lookup_entities(entity_ids, version)
+    if to_fetch:
+        found_ids, X, _ = get_feature_store().export_matrix(FEATURE_COLUMNS, label_column=None, entity_ids=to_fetch)
+        rows.update(cache_entity_rows(version, found_ids, X))
+
+    scored = [entity_id for entity_id in entity_ids if entity_id not in results and entity_id in rows]
+    if scored:
+        features = np.stack([rows[entity_id] for entity_id in scored])
+        results.update(cache_entity_results(version, scored, score_features(features, bundle, record_drift=False)))
+
+    return entity_results(entity_ids, results)
+
+def record_micro_batch(batch_size, queue_delays):
+    micro_batch_size.observe(batch_size)
+    for delay in queue_delays:
+        micro_batch_queue_seconds.observe(delay)
+
+if MICRO_BATCH_MAX_SIZE > 1:
+    micro_batcher = MicroBatcher(
+        score_features,
+        max_batch_size=MICRO_BATCH_MAX_SIZE,
+        max_wait_ms=MICRO_BATCH_MAX_WAIT_MS,
+        on_batch=record_micro_batch,
+    ).start()
 
 @app.route('/')
 def home():
     """Render the home page"""
     return render_template('index.html')
 
+def model_not_ready():
+    return jsonify({'error': 'Model is not loaded yet', 'status': 'starting'}), 503
+
 @app.route('/predict', methods=['POST'])
 def predict():
     """Handle prediction requests"""
+    if not startup_state['model_ready']:
+        return model_not_ready()
     try:
         # Get form data
         if request.is_json:
@@ -182,54 +453,117 @@ def predict():
         else:
             data = request.form.to_dict()
         
-        # Prepare features with one-hot encoding
-        features_dict = prepare_features(data)
+        # Encode with the live model's transformer, in FEATURE_COLUMNS order
+        bundle = serving
+        features = bundle.encoder.encode(data).reshape(1, -1)
+
+        # Make prediction, coalesced with concurrent requests when enabled
+        if micro_batcher is not None:
+            result = micro_batcher.submit(features).result()
+        else:
+            result = score_features(features, bundle)[0]
         
-        # Create DataFrame with features in correct order
-        input_df = pd.DataFrame([features_dict], columns=FEATURE_COLUMNS)
+        return jsonify(result)
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
 
-        ##### Data Drift Detection
-        features_scaled = scaler.transform(input_df)
+def load_batch_features(encoder):
+    """Encode a batch of customers sent as a JSON array, an NDJSON body or
+    a columnar ``{"columns": {field: [values]}}`` object"""
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        body = request.get_data(as_text=True)
+        records = [json.loads(line) for line in body.splitlines() if line.strip()]
+        return encoder.encode_records(records)
 
-        drift = ksd.predict(features_scaled)
-        print("Drift Response : ",drift)
+    payload = request.get_json()
+    if isinstance(payload, dict) and isinstance(payload.get('columns'), dict):
+        return encoder.encode_columns(payload['columns'])
+    if isinstance(payload, dict):
+        payload = payload.get('customers')
+    if not isinstance(payload, list):
+        raise ValueError("Expected a JSON array, NDJSON stream or columns object of customers")
+    return encoder.encode_records(payload)
 
-        drift_response = drift.get('data',{})
-        is_drift = drift_response.get('is_drift' , None)
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    """Score many customers with one model call, results in input order"""
+    if not startup_state['model_ready']:
+        return model_not_ready()
+    try:
+        # One contiguous float32 feature matrix for the whole batch
+        bundle = serving
+        features = load_batch_features(bundle.encoder)
+        if len(features) == 0:
+            return jsonify({'predictions': [], 'count': 0, 'drift': latest_drift()})
 
-        if is_drift is not None and is_drift==1:
-            print("Drift Detected....")
-            logger.info("Drift Detected....")
+        results = score_features(features, bundle)
+
+        return jsonify({'predictions': results, 'count': len(results), 'drift': latest_drift()})
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/predict/entity/<entity_id>', methods=['GET'])
+def predict_entity(entity_id):
+    """Score one customer from the feature store by CLIENTNUM"""
+    if not startup_state['model_ready']:
+        return model_not_ready()
+    try:
+        results, _ = score_entities([entity_id])
+        if entity_id not in results:
+            return jsonify({'error': f'No stored features for entity {entity_id}'}), 404
+        return jsonify(results[entity_id])
 
-            drift_count.inc()
-        
-        # Make prediction
-        prediction = model.predict(input_df)[0]
-        prediction_count.inc()
-        probability = model.predict_proba(input_df)[0]
-        
-        # Format response
-        result = {
-            'prediction': int(prediction),
-            'attrition_probability': float(probability[1]),
-            'retention_probability': float(probability[0]),
-            'status': 'Attrited Customer' if prediction == 1 else 'Existing Customer',
-            'risk_level': 'High' if probability[1] > 0.7 else 'Medium' if probability[1] > 0.4 else 'Low'
-        }
-        
-        return jsonify(result)
-    
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
+@app.route('/predict/entities', methods=['POST'])
+def predict_entities():
+    """Score many customers by CLIENTNUM, ``{"entity_ids": [...]}``"""
+    if not startup_state['model_ready']:
+        return model_not_ready()
+    try:
+        payload = request.get_json()
+        entity_ids = payload.get('entity_ids') if isinstance(payload, dict) else payload
+        if not isinstance(entity_ids, list):
+            raise ValueError("Expected a JSON array or an entity_ids list")
+
+        results, missing = score_entities(entity_ids)
+        return jsonify({'predictions': list(results.values()), 'count': len(results), 'missing': missing})
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+# Model and drift reference load in the background; /health reports progress
+start_background_initialization()
+
+def health_status():
+    """Readiness summary shared by the Flask and ASGI /health routes"""
+    if startup_state['model_ready'] and startup_state['drift_ready']:
+        status = 'healthy'
+    elif startup_state['finished']:
+        status = 'degraded'
+    else:
+        status = 'starting'
+
+    return {
+        'status': status,
+        'model_loaded': model is not None,
+        'model_ready': startup_state['model_ready'],
+        'model_version': model_version,
+        'model_source': serving.source if serving is not None else None,
+        'reference_version': reference_version,
+        'drift_ready': startup_state['drift_ready'],
+        'startup_seconds': startup_state['timings'],
+        'startup_errors': startup_state['errors'],
+        'features_count': len(FEATURE_COLUMNS)
+    }
+
 @app.route('/health')
 def health():
     """Health check endpoint"""
-    return jsonify({
-        'status': 'healthy',
-        'model_loaded': model is not None,
-        'features_count': len(FEATURE_COLUMNS)
-    })
+    return jsonify(health_status())
 
 @app.route('/metrics')
 def metrics():
@@ -240,6 +574,4 @@ def metrics():
 
 if __name__ == '__main__':
     start_http_server()
-    # Load model before starting the server
-    load_model_from_dvc()
     app.run(debug=True, host='0.0.0.0', port=5000)
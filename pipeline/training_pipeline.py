@@ -1,20 +1,75 @@
+import os
+import argparse
 from src.data_ingestion import DataIngestion
 from src.data_preprocessing import DataProcessing
-from src.model_training import ModelTraining
+from src.model_training import ModelTraining, SEARCH_MODES, INCREMENTAL_GUARDS
 from src.feature_store import RedisFeatureStore
+from src.reference_snapshot import build_reference_snapshot
+from src.model_registry import register_model
+from src.incremental_state import save_state
+from src.logger import get_logger
 from config.path_config import *
 from config.database_config import DB_CONFIG
 
+logger = get_logger(__name__)
+
 
 if __name__=="__main__":
-    data_ingestion = DataIngestion(DB_CONFIG , RAW_DIR)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--incremental' , action='store_true',
+                        help="only ingest and store rows changed since the last run and continue boosting the saved model")
+    parser.add_argument('--incremental-guard' , default='previous' , choices=INCREMENTAL_GUARDS,
+                        help="what an incremental update must match on the holdout to be kept: the previous model "
+                             "(a full retrain only when it falls short) or a full retrain fitted on every run , "
+                             "which makes --incremental cost more than a full run")
+    parser.add_argument('--streaming' , action='store_true',
+                        help="extract through a server-side cursor and write the raw datasets chunk by chunk")
+    parser.add_argument('--fetch-size' , type=int , default=10000)
+    parser.add_argument('--search-mode' , default='grid' , choices=SEARCH_MODES)
+    parser.add_argument('--format' , default=ARTIFACT_FORMAT , choices=('parquet' , 'csv'),
+                        help="format of the raw artifacts handed from ingestion to preprocessing")
+    parser.add_argument('--train-source' , default='feature_store' , choices=('feature_store' , 'parquet'),
+                        help="read the training matrix from Redis or from the processed Parquet features")
+    parser.add_argument('--chunk-size' , type=int , default=None,
+                        help="preprocess in two streaming passes of this many rows instead of loading the whole table")
+    args = parser.parse_args()
+
+    data_ingestion = DataIngestion(DB_CONFIG , RAW_DIR , incremental=args.incremental ,
+                                   streaming=args.streaming , fetch_size=args.fetch_size , output_format=args.format)
     data_ingestion.run()
 
+    if args.incremental and data_ingestion.row_count == 0:
+        logger.info(f"No rows changed since {data_ingestion.high_water_mark} , nothing to retrain")
+        raise SystemExit(0)
+
     feature_store = RedisFeatureStore()
 
-    data_processor = DataProcessing(TRAIN_PATH,TEST_PATH,feature_store)
+    paths = data_ingestion.output_paths
+    if args.incremental:
+        # The processed delta must not replace the full processed dataset
+        data_processor = DataProcessing(paths['delta'],None,feature_store,os.path.join(PROCESSED_DIR , 'delta') , chunk_size=args.chunk_size)
+    else:
+        data_processor = DataProcessing(paths['train'],paths['test'],feature_store , chunk_size=args.chunk_size)
     data_processor.run()
 
     feature_store = RedisFeatureStore()
-    model_trainer = ModelTraining(feature_store)
-    model_trainer.run()
\ No newline at end of file
+    # An incremental run only processed the delta, so it trains from Redis
+    train_source = 'feature_store' if args.incremental else args.train_source
+    model_trainer = ModelTraining(feature_store , search_mode=args.search_mode , data_source=train_source ,
+                                  incremental_guard=args.incremental_guard)
+    model_trainer.run(changed_ids=data_ingestion.entity_ids if args.incremental else None)
+
+    # Scaler + drift reference snapshot the service loads at startup
+    build_reference_snapshot(feature_store)
+
+    # Content-hashed model + its reference version; running services pick it up
+    model_version = register_model(os.path.join(MODEL_PATH , "lgb_model.pkl"))
+
+    # Only a completed run moves the high-water mark forward
+    save_state({
+        'high_water_mark': data_ingestion.new_high_water_mark,
+        'watermark_column': data_ingestion.watermark_column,
+        'mode': 'incremental' if args.incremental else 'full',
+        'rows': data_ingestion.row_count,
+        'model_version': model_version,
+    })
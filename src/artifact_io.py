@@ -0,0 +1,118 @@
+import os
+import shutil
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+FORMATS = ("parquet" , "csv")
+
+
+class PartitionWriter:
+    """Writes DataFrames as consecutive part files of one Parquet dataset.
+
+    The schema of the first part is kept for the rest, so a later chunk
+    where a column happens to be all-null (or all-int in a float column)
+    still produces a dataset that reads back as one table.
+    """
+
+    def __init__(self , dataset_dir , compression="snappy"):
+        self.dataset_dir = dataset_dir
+        self.compression = compression
+        self.schema = None
+        self.parts = 0
+        self.rows = 0
+
+        # A dataset is always rewritten as a whole
+        if os.path.isdir(dataset_dir):
+            shutil.rmtree(dataset_dir)
+        os.makedirs(dataset_dir , exist_ok=True)
+
+    def write(self , df):
+        if len(df) == 0:
+            return
+        table = pa.Table.from_pandas(df , schema=self.schema , preserve_index=False)
+        if self.schema is None:
+            self.schema = table.schema
+        pq.write_table(table , os.path.join(self.dataset_dir , f"part-{self.parts:05d}.parquet") , compression=self.compression)
+        self.parts += 1
+        self.rows += len(df)
+
+
+class CsvWriter:
+    """Same interface as PartitionWriter, appending to a single CSV file"""
+
+    def __init__(self , path):
+        self.path = path
+        self.rows = 0
+        if os.path.exists(path):
+            os.remove(path)
+        os.makedirs(os.path.dirname(path) or "." , exist_ok=True)
+
+    def write(self , df):
+        if len(df) == 0:
+            return
+        df.to_csv(self.path , mode='a' , header=self.rows == 0 , index=False)
+        self.rows += len(df)
+
+
+def open_writer(path , output_format="parquet"):
+    if output_format not in FORMATS:
+        raise ValueError(f"Unknown artifact format {output_format}")
+    return PartitionWriter(path) if output_format == "parquet" else CsvWriter(path)
+
+
+def write_frame(df , path , output_format="parquet" , rows_per_part=100000):
+    """Write a whole frame, split into parts of `rows_per_part` rows"""
+    writer = open_writer(path , output_format)
+    for start in range(0 , len(df) , rows_per_part):
+        writer.write(df.iloc[start:start + rows_per_part])
+    return writer.rows
+
+
+def is_csv(path):
+    return path.endswith(".csv")
+
+
+def read_frame(path , columns=None , memory_map=True):
+    """Load a Parquet dataset (or a single file, or a CSV) as a DataFrame,
+    reading only `columns` when given. Columns missing from the data are
+    skipped rather than raising."""
+    if is_csv(path):
+        if columns is None:
+            return pd.read_csv(path)
+        return pd.read_csv(path , usecols=lambda column: column in set(columns))
+
+    if columns is not None:
+        available = set(pq.read_schema(dataset_files(path)[0]).names)
+        columns = [column for column in columns if column in available]
+    return pq.read_table(path , columns=columns , memory_map=memory_map).to_pandas()
+
+
+def iter_frames(path , columns=None , batch_size=100000 , memory_map=True):
+    """Yield a Parquet dataset (or a CSV) as DataFrames of up to `batch_size` rows"""
+    if is_csv(path):
+        usecols = None if columns is None else (lambda column: column in set(columns))
+        yield from pd.read_csv(path , usecols=usecols , chunksize=batch_size)
+        return
+
+    for filename in dataset_files(path):
+        parquet_file = pq.ParquetFile(filename , memory_map=memory_map)
+        names = parquet_file.schema_arrow.names
+        selected = None if columns is None else [column for column in columns if column in names]
+        for batch in parquet_file.iter_batches(batch_size=batch_size , columns=selected):
+            yield batch.to_pandas()
+
+
+def dataset_files(path):
+    if os.path.isdir(path):
+        files = sorted(
+            os.path.join(path , name) for name in os.listdir(path)
+            if name.endswith(".parquet")
+        )
+        if not files:
+            raise FileNotFoundError(f"No parquet files in {path}")
+        return files
+    return [path]
@@ -3,23 +3,71 @@ import pandas as pd
 from src.logger import get_logger
 from src.custom_exception import CustomException
 import os
+import zlib
+import numpy as np
 from sklearn.model_selection import train_test_split
 import sys
 from config.database_config import DB_CONFIG
 from config.path_config import *
+from src.incremental_state import load_state
+from src.artifact_io import open_writer, write_frame
 
 logger = get_logger(__name__)
 
+# Streaming mode assigns a customer to the test split when
+# crc32(CLIENTNUM) % SPLIT_BUCKETS falls below test_size * SPLIT_BUCKETS,
+# so the split does not depend on row order or chunking
+SPLIT_BUCKETS = 10000
+
+
+def hash_split_mask(entity_ids , test_size=0.2):
+    """Boolean mask of the rows that belong to the test split"""
+    buckets = np.fromiter((zlib.crc32(str(entity_id).encode()) % SPLIT_BUCKETS for entity_id in entity_ids) ,
+                          dtype=np.int64 , count=len(entity_ids))
+    return buckets < int(test_size * SPLIT_BUCKETS)
+
+
 class DataIngestion:
 
-    def __init__(self , db_params , output_dir):
+    def __init__(self , db_params , output_dir , incremental=False , watermark_column=None , state_path=INCREMENTAL_STATE_PATH ,
+                 streaming=False , fetch_size=10000 , test_size=0.2 , connect=None , output_format=ARTIFACT_FORMAT):
         self.db_params = db_params
         self.output_dir = output_dir
 
+        # Parquet datasets by default, CSV files for the original layout
+        self.output_format = output_format
+        if output_format == "csv":
+            self.output_paths = {'train': TRAIN_PATH , 'test': TEST_PATH , 'delta': DELTA_PATH}
+        else:
+            self.output_paths = {'train': TRAIN_DATASET , 'test': TEST_DATASET , 'delta': DELTA_DATASET}
+
+        # Streaming mode reads `fetch_size` rows at a time through a
+        # server-side cursor and appends each chunk to the outputs, so memory
+        # stays flat whatever the table size. `connect` may return any DB-API
+        # connection (e.g. sqlite3) instead of the psycopg2 one.
+        self.streaming = streaming
+        self.fetch_size = fetch_size
+        self.test_size = test_size
+        self.connect = connect
+
+        # Incremental runs only extract rows whose watermark column (an
+        # updated-at timestamp or ingestion batch id) is above the high-water
+        # mark of the last successful run
+        self.incremental = incremental
+        self.watermark_column = watermark_column or os.getenv('INGEST_WATERMARK_COLUMN' , 'updated_at')
+        if not self.watermark_column.isidentifier():
+            raise ValueError(f"Invalid watermark column {self.watermark_column}")
+        self.high_water_mark = load_state(state_path).get('high_water_mark') if incremental else None
+        self.new_high_water_mark = None
+        self.row_count = 0
+        self.entity_ids = []
+
         os.makedirs(self.output_dir , exist_ok=True)
 
     def connect_to_db(self):
         try:
+            if self.connect is not None:
+                return self.connect()
             conn = psycopg2.connect(
                 host = self.db_params['host'],
                 port = self.db_params['port'],
@@ -34,13 +82,72 @@ class DataIngestion:
             logger.error(f"Error while establishing connection {e}")
             raise CustomException(str(e),sys)
         
+    def check_watermark(self , columns):
+        """Incremental runs need the watermark column: without it there is no
+        high-water mark and every run would re-ingest the whole table"""
+        if self.watermark_column in columns:
+            return
+        if self.incremental:
+            raise ValueError(f"Watermark column {self.watermark_column} is not in the extracted table , "
+                             f"set INGEST_WATERMARK_COLUMN or run without --incremental")
+        logger.warning(f"Watermark column {self.watermark_column} is not in the extracted table , incremental runs will fail")
+
+    def build_query(self , conn):
+        """SELECT for this run and its parameters, in the driver's paramstyle"""
+        query = f"SELECT * FROM {os.getenv('INGEST_TABLE' , 'public.titanic')}"
+        if self.high_water_mark is None:
+            return query , None
+
+        driver = sys.modules.get(type(conn).__module__.split('.')[0])
+        if getattr(driver , 'paramstyle' , 'pyformat') == 'qmark':
+            return query + f" WHERE {self.watermark_column} > ?" , (self.high_water_mark,)
+        return query + f" WHERE {self.watermark_column} > %(high_water_mark)s" , {'high_water_mark': self.high_water_mark}
+
+    def open_cursor(self , conn):
+        try:
+            # psycopg2 named cursor: rows stay on the server until fetched
+            cursor = conn.cursor(name='data_ingestion')
+            cursor.itersize = self.fetch_size
+            return cursor
+        except TypeError:
+            return conn.cursor()
+
+    def extract_chunks(self):
+        """Yield the table as DataFrames of up to `fetch_size` rows"""
+        conn = self.connect_to_db()
+        try:
+            query , params = self.build_query(conn)
+            cursor = self.open_cursor(conn)
+            if params is None:
+                cursor.execute(query)
+            else:
+                cursor.execute(query , params)
+
+            columns = None
+            while True:
+                rows = cursor.fetchmany(self.fetch_size)
+                if not rows:
+                    break
+                # A named cursor only has a description after the first fetch
+                columns = columns or [column[0] for column in cursor.description]
+                yield pd.DataFrame.from_records(rows , columns=columns)
+            cursor.close()
+        finally:
+            conn.close()
+
     def extract_data(self):
         try:
             conn = self.connect_to_db()
-            query = "SELECT * FROM public.titanic"
-            df = pd.read_sql_query(query,conn)
+            query , params = self.build_query(conn)
+            df = pd.read_sql_query(query,conn,params=params)
             conn.close()
-            logger.info("Data extracted from DB")
+
+            self.check_watermark(df.columns)
+            if self.watermark_column in df.columns and len(df):
+                self.new_high_water_mark = df[self.watermark_column].max()
+            else:
+                self.new_high_water_mark = self.high_water_mark
+            logger.info(f"Data extracted from DB ({len(df)} rows{' since ' + str(self.high_water_mark) if params else ''})")
             return df
         except Exception as e:
             logger.error(f"Error while extracting data {e}")
@@ -48,18 +155,62 @@ class DataIngestion:
         
     def save_data(self , df):
         try:
+            self.row_count = len(df)
+            if self.incremental:
+                # Changed customers only; the split happens on the feature store
+                self.entity_ids = df['CLIENTNUM'].astype(str).tolist()
+                write_frame(df , self.output_paths['delta'] , self.output_format)
+                logger.info(f"Saved {len(df)} changed rows to {self.output_paths['delta']}")
+                return
+
             train_df , test_df = train_test_split(df ,test_size=0.2 , random_state=42)
-            train_df.to_csv(TRAIN_PATH,index=False)
-            test_df.to_csv(TEST_PATH , index=False)
+            write_frame(train_df , self.output_paths['train'] , self.output_format)
+            write_frame(test_df , self.output_paths['test'] , self.output_format)
 
             logger.info("Data Splitting and saving done")
         except Exception as e:
             logger.error(f"Error while saving data {e}")
             raise CustomException(str(e),sys)
         
+    def stream_data(self):
+        """Extract and write chunk by chunk; train/test membership comes
+        from a hash of CLIENTNUM"""
+        try:
+            splits = ['delta'] if self.incremental else ['train' , 'test']
+            writers = {split: open_writer(self.output_paths[split] , self.output_format) for split in splits}
+
+            high_water_mark = None
+            for i , chunk in enumerate(self.extract_chunks()):
+                self.row_count += len(chunk)
+                if i == 0:
+                    self.check_watermark(chunk.columns)
+                if self.watermark_column in chunk.columns:
+                    chunk_max = chunk[self.watermark_column].max()
+                    if high_water_mark is None or chunk_max > high_water_mark:
+                        high_water_mark = chunk_max
+
+                if self.incremental:
+                    self.entity_ids.extend(chunk['CLIENTNUM'].astype(str))
+                    writers['delta'].write(chunk)
+                else:
+                    is_test = hash_split_mask(chunk['CLIENTNUM'].to_numpy() , self.test_size)
+                    writers['train'].write(chunk[~is_test])
+                    writers['test'].write(chunk[is_test])
+                logger.info(f"Wrote chunk {i} ({len(chunk)} rows , {self.row_count} so far)")
+
+            self.new_high_water_mark = high_water_mark if high_water_mark is not None else self.high_water_mark
+            logger.info(f"Streamed {self.row_count} rows to " + ' , '.join(f"{self.output_paths[split]} ({writer.rows})" for split , writer in writers.items()))
+        except Exception as e:
+            logger.error(f"Error while streaming data {e}")
+            raise CustomException(str(e),sys)
+
     def run(self):
         try:
             logger.info("Data Ingestion Pipleine Started..../")
+            if self.streaming:
+                self.stream_data()
+                logger.info("End of Data Ingestion Pipline..")
+                return
             df = self.extract_data()
             self.save_data(df)
             logger.info("End of Data Ingestion Pipline..")
@@ -1,18 +1,38 @@
+import sys
+import os
 import pandas as pd
+import numpy as np
+import time
 from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
 from src.feature_store import RedisFeatureStore
+from src.feature_transformer import FeatureTransformer
 from src.logger import get_logger
 from src.custom_exception import CustomException
 from config.path_config import *
+from config.feature_config import FEATURE_COLUMNS, LABEL_COLUMN, RAW_COLUMNS
+from src.artifact_io import read_frame, write_frame, iter_frames, open_writer
 
 logger = get_logger(__name__)
 
+LABEL_MAP = {
+    'Existing Customer': 0,
+    'Attrited Customer': 1
+}
+
 
 class DataProcessing:
-    def __init__(self, train_data_path , test_data_path , feature_store : RedisFeatureStore):
+    def __init__(self, train_data_path , test_data_path , feature_store : RedisFeatureStore , processed_path=PROCESSED_FEATURES , transformer_path=FEATURE_TRANSFORMER_PATH ,
+                 chunk_size=None):
         self.train_data_path = train_data_path
         self.test_data_path = test_data_path
+        # Encoded features are also written here as Parquet (None to skip)
+        self.processed_path = processed_path
+        # Fitted encoding, registered with the model and used by the service
+        self.transformer_path = transformer_path
+        self.transformer = None
+        # Rows per chunk in the two-pass streaming mode; None loads the
+        # whole table into memory
+        self.chunk_size = chunk_size
         self.data=None
         self.test_data = None
         self.X_train = None
@@ -20,117 +40,171 @@ class DataProcessing:
         self.y_train=None
         self.y_test = None
 
-        self.X_scaled = None
-
         self.feature_store = feature_store
         logger.info("Your Data Processing is intialized...")
     
     def load_data(self):
         try:
-            self.data = pd.read_csv(self.train_data_path)
-            self.test_data = pd.read_csv(self.test_data_path)
+            # Parquet dataset or CSV; only the columns preprocessing uses
+            self.data = read_frame(self.train_data_path , columns=RAW_COLUMNS)
+            # Incremental runs process a single delta file
+            if self.test_data_path is not None:
+                self.test_data = read_frame(self.test_data_path , columns=RAW_COLUMNS)
             logger.info("Read the data sucesfully")
         except Exception as e:
             logger.error(f"Error while reading data {e}")
-            raise CustomException(str(e))
+            raise CustomException(str(e) , sys)
     
 
+    def load_fitted_transformer(self):
+        """Incremental runs encode the delta with the transformer fitted on
+        the full table rather than refitting on a few rows"""
+        if self.test_data_path is None and os.path.exists(self.transformer_path):
+            self.transformer = FeatureTransformer.load(self.transformer_path)
+            self.transformer.check_columns(FEATURE_COLUMNS)
+            return True
+        return False
+
     def preprocess_data(self):
         try:
             
-            self.data['Attrition_Flag'] = self.data['Attrition_Flag'].map({
-                'Existing Customer': 0,
-                'Attrited Customer': 1
-            })
-
-            # Gender: binary label encoding
-            self.data['Gender'] = self.data['Gender'].map({'M': 1, 'F': 0})
-
-            # Remaining categoric variables: OneHotEncoding
-            self.data = pd.get_dummies(self.data, columns=[
-                'Education_Level',
-                'Marital_Status',
-                'Income_Category',
-                'Card_Category'
-            ], drop_first=True)
+            self.data[LABEL_COLUMN] = self.data[LABEL_COLUMN].map(LABEL_MAP)
+
+            if not self.load_fitted_transformer():
+                self.transformer = FeatureTransformer().fit(self.data)
+                self.transformer.save(self.transformer_path)
+
+            # Gender as 0/1 and the categoric variables one-hot encoded with the
+            # fitted vocabularies, straight into FEATURE_COLUMNS order. A batch
+            # missing some categories encodes the same way as the full table.
+            features = pd.DataFrame(self.transformer.transform(self.data) , columns=self.transformer.feature_columns , index=self.data.index)
+            self.data = pd.concat([self.data[["CLIENTNUM" , LABEL_COLUMN]] , features] , axis=1)
 
             logger.info("Data Preprocessing done...")
 
         except Exception as e:
             logger.error(f"Error while preprocessing data {e}")
-            raise CustomException(str(e))
+            raise CustomException(str(e) , sys)
         
     def drop_cols(self):
         try:
+            # CLIENTNUM stays: it is the entity id in the feature store
             self.data = self.data.drop(['Naive_Bayes_Classifier_Attrition_Flag_Card_Category_Contacts_Count_12_mon_Dependent_count_Education_Level_Months_Inactive_12_mon_1',
-                'Naive_Bayes_Classifier_Attrition_Flag_Card_Category_Contacts_Count_12_mon_Dependent_count_Education_Level_Months_Inactive_12_mon_2',
-                'CLIENTNUM'],axis='columns', inplace=True)
+                'Naive_Bayes_Classifier_Attrition_Flag_Card_Category_Contacts_Count_12_mon_Dependent_count_Education_Level_Months_Inactive_12_mon_2'],axis='columns',errors='ignore')
         except Exception as e:
             logger.error(f"Error while Dropping columns")
 
     
-    def scale_data(self):
+    def store_feature_in_redis(self , chunk_size=50000):
         try:
-            X = self.data.drop(["Attrited Customer"])
-            y = self.data['Attrited Customer']
+            # Select the stored columns once; missing dummy columns are all-zero
+            columns = [LABEL_COLUMN] + FEATURE_COLUMNS
+            features = self.data.reindex(columns=columns , fill_value=0)
+            entity_ids = self.data["CLIENTNUM"].astype(str).to_numpy()
 
-            scaler = StandardScaler()
-            
-            self.X_scaled= scaler.fit_transform(X=X)
+            total = len(features)
+            start_time = time.perf_counter()
+            for start in range(0 , total , chunk_size):
+                chunk_start = time.perf_counter()
+                end = min(start + chunk_size , total)
 
-            logger.info("Scaled data sucesfully...")
+                block = features.iloc[start:end].to_numpy(dtype=np.float32)
+                self.feature_store.store_matrix(entity_ids[start:end] , block , columns)
 
-        except Exception as e:
-            logger.error(f"Error while scaling data {e}")
-            raise CustomException(str(e))
-    
-    def store_feature_in_redis(self):
-        try:
-            batch_data = {}
-            for idx,row in self.data.iterrows():
-                entity_id = row["CLIENTNUM"]
-                features = {
-                    "Attrition_Flag" : row['Attrition_Flag'],
-                    "Contacts_Count_12_mon" : row["Contacts_Count_12_mon"],
-                    "Months_Inactive_12_mon" : row["Months_Inactive_12_mon"],
-                    "Education_Level_Doctorate" : row["Education_Level_Doctorate"],
-                    "Income_Category_Less than $40K" : row["Income_Category_Less than $40K"],
-                    "Marital_Status_Single": row["Marital_Status_Single"],
-                    "Dependent_count" : row["Dependent_count"],
-                    "Customer_Age" : row["Customer_Age"],
-                    "Months_on_book" : row["Months_on_book"],
-                    "Education_Level_Post-Graduate" : row["Education_Level_Post-Graduate"],
-                    "Card_Category_Platinum" : row["Card_Category_Platinum"],
-                    "Education_Level_Unknown" : row["Education_Level_Unknown"],
-                    "Marital_Status_Unknown" : row["Marital_Status_Unknown"],
-                    "Income_Category_Unknown" : row["Income_Category_Unknown"],
-                    "Card_Category_Gold" : row["Card_Category_Gold"],
-                    "Avg_Open_To_Buy" : row["Avg_Open_To_Buy"],
-                    "Education_Level_Uneducated" : row["Education_Level_Uneducated"],
-                    "Income_Category_$80K - $120K" : row["Income_Category_$80K - $120K"],
-                    "Card_Category_Silver" : row["Card_Category_Silver"],
-                    "Education_Level_Graduate" : row["Education_Level_Graduate"],
-                    "Income_Category_$40K - $60K" : row["Income_Category_$40K - $60K"],
-                    "Education_Level_High School" : row["Education_Level_High School"],
-                    "Marital_Status_Married" : row["Marital_Status_Married"],
-                    "Credit_Limit" : row["Credit_Limit"],
-                    "Income_Category_$60K - $80K" : row["Income_Category_$60K - $80K"],
-                    "Gender" : row["Gender"],
-                    "Total_Amt_Chng_Q4_Q1" : row["Total_Amt_Chng_Q4_Q1"],
-                    "Total_Relationship_Count" : row["Total_Relationship_Count"],
-                    "Total_Trans_Amt" : row["Total_Trans_Amt"],
-                    "Avg_Utilization_Ratio" : row["Avg_Utilization_Ratio"],
-                    "Total_Revolving_Bal" : row["Total_Revolving_Bal"],
-                    "Total_Ct_Chng_Q4_Q1" : row["Total_Ct_Chng_Q4_Q1"],
-                    "Total_Trans_Ct" : row["Total_Trans_Ct"]
-                }
-                batch_data[entity_id] = features
-            self.feature_store.store_batch_features(batch_data)
-            logger.info("Data has been feeded into Feature Store..")
+                elapsed = time.perf_counter() - chunk_start
+                logger.info(f"Stored rows {start}-{end} of {total} in {elapsed:.3f}s ({(end - start) / max(elapsed , 1e-9):.0f} rows/s)")
+
+            logger.info(f"Data has been feeded into Feature Store.. {total} rows in {time.perf_counter() - start_time:.2f}s")
         except Exception as e:
             logger.error(f"Error while feature storing data {e}")
-            raise CustomException(str(e))
+            raise CustomException(str(e) , sys)
         
+    def save_processed_data(self):
+        """Write CLIENTNUM, the label and FEATURE_COLUMNS as typed Parquet"""
+        try:
+            if self.processed_path is None:
+                return
+            features = self.data.reindex(columns=[LABEL_COLUMN] + FEATURE_COLUMNS , fill_value=0).astype(np.float32)
+            features.insert(0 , "CLIENTNUM" , self.data["CLIENTNUM"].to_numpy())
+            rows = write_frame(features , self.processed_path)
+            logger.info(f"Processed features written to {self.processed_path} ({rows} rows)")
+        except Exception as e:
+            logger.error(f"Error while saving processed data {e}")
+            raise CustomException(str(e) , sys)
+
+    def fit_chunked(self):
+        """First streaming pass: category vocabularies and dtypes into the
+        transformer. Skipped when the fitted transformer is reused; the
+        stored features stay unscaled (the drift scaler is fitted by
+        build_reference_snapshot)"""
+        try:
+            if self.load_fitted_transformer():
+                return 0
+            start = time.perf_counter()
+            self.transformer = FeatureTransformer()
+
+            rows = 0
+            for chunk in iter_frames(self.train_data_path , columns=RAW_COLUMNS , batch_size=self.chunk_size):
+                self.transformer.partial_fit(chunk)
+                rows += len(chunk)
+
+            self.transformer.save(self.transformer_path)
+            elapsed = time.perf_counter() - start
+            logger.info(f"Fit pass: {rows} rows in {elapsed:.2f}s ({rows / max(elapsed , 1e-9):.0f} rows/s)")
+            return rows
+        except Exception as e:
+            logger.error(f"Error while fitting on data chunks {e}")
+            raise CustomException(str(e) , sys)
+
+    def transform_chunked(self):
+        """Second streaming pass: encode every chunk and write it to the
+        feature store and the processed Parquet dataset.
+
+        Only one chunk is in memory at a time; the time spent reading,
+        encoding, storing and writing is logged per stage.
+        """
+        try:
+            columns = [LABEL_COLUMN] + FEATURE_COLUMNS
+            writer = open_writer(self.processed_path) if self.processed_path is not None else None
+            stages = {"read": 0.0 , "encode": 0.0 , "store": 0.0 , "write": 0.0}
+            rows = 0
+
+            chunks = iter_frames(self.train_data_path , columns=RAW_COLUMNS , batch_size=self.chunk_size)
+            while True:
+                stage_start = time.perf_counter()
+                chunk = next(chunks , None)
+                stages["read"] += time.perf_counter() - stage_start
+                if chunk is None:
+                    break
+
+                stage_start = time.perf_counter()
+                block = np.empty((len(chunk) , len(columns)) , dtype=np.float32)
+                block[:, 0] = chunk[LABEL_COLUMN].map(LABEL_MAP).to_numpy(dtype=np.float32)
+                block[:, 1:] = self.transformer.transform(chunk)
+                entity_ids = chunk["CLIENTNUM"].astype(str).to_numpy()
+                stages["encode"] += time.perf_counter() - stage_start
+
+                stage_start = time.perf_counter()
+                self.feature_store.store_matrix(entity_ids , block , columns)
+                stages["store"] += time.perf_counter() - stage_start
+
+                if writer is not None:
+                    stage_start = time.perf_counter()
+                    features = pd.DataFrame(block , columns=columns)
+                    features.insert(0 , "CLIENTNUM" , chunk["CLIENTNUM"].to_numpy())
+                    writer.write(features)
+                    stages["write"] += time.perf_counter() - stage_start
+
+                rows += len(chunk)
+
+            for stage , seconds in stages.items():
+                logger.info(f"Transform pass {stage}: {seconds:.2f}s ({rows / max(seconds , 1e-9):.0f} rows/s)")
+            logger.info(f"Data has been feeded into Feature Store.. {rows} rows in {sum(stages.values()):.2f}s")
+            return rows
+        except Exception as e:
+            logger.error(f"Error while transforming data chunks {e}")
+            raise CustomException(str(e) , sys)
+
     # Optional
     def retrive_feature_redis_store(self,entity_id):
         features = self.feature_store.get_features(entity_id)
@@ -141,22 +215,31 @@ class DataProcessing:
     def run(self):
         try:
             logger.info("Starting our Data Processing Pipleine...")
+            if self.chunk_size:
+                self.fit_chunked()
+                self.transform_chunked()
+                logger.info("End of pipeline Data Processing...")
+                return
+
             self.load_data()
             self.preprocess_data()
             self.drop_cols()
-            self.scale_data()
             self.store_feature_in_redis()
+            self.save_processed_data()
 
             logger.info("End of pipeline Data Processing...")
 
         except Exception as e:
             logger.error(f"Error while Data Processing Pipleine {e}")
-            raise CustomException(str(e))
+            raise CustomException(str(e) , sys)
         
 if __name__=="__main__":
     feature_store = RedisFeatureStore()
 
-    data_processor = DataProcessing(TRAIN_PATH,TEST_PATH,feature_store)
+    if ARTIFACT_FORMAT == "csv":
+        data_processor = DataProcessing(TRAIN_PATH,TEST_PATH,feature_store)
+    else:
+        data_processor = DataProcessing(TRAIN_DATASET,TEST_DATASET,feature_store)
     data_processor.run()
 
 
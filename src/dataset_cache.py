@@ -0,0 +1,113 @@
+import os
+import json
+import time
+import hashlib
+import numpy as np
+import lightgbm as lgb
+from sklearn.preprocessing import LabelEncoder
+from src.logger import get_logger
+from config.path_config import *
+from config.feature_config import FEATURE_COLUMNS
+
+logger = get_logger(__name__)
+
+# Binning parameters baked into a saved Dataset; training params passed
+# alongside a cached Dataset must agree with them
+DATASET_PARAMS = {'max_bin': 255, 'verbose': -1}
+
+
+def data_fingerprint(X , y , columns=FEATURE_COLUMNS , params=DATASET_PARAMS):
+    """Hash of the training matrix, labels, column order and binning params"""
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(X , dtype=np.float32).tobytes())
+    digest.update(np.ascontiguousarray(y , dtype=np.float32).tobytes())
+    digest.update(json.dumps([list(columns) , params] , sort_keys=True).encode())
+    return digest.hexdigest()[:16]
+
+
+def load_or_build_dataset(X , y , columns=FEATURE_COLUMNS , cache_dir=DATASET_CACHE_DIR , params=DATASET_PARAMS):
+    """Constructed (binned) lgb.Dataset for (X, y), from LightGBM's binary
+    format under `cache_dir` when the same data was binned before.
+
+    Returns (dataset, info); info holds the fingerprint, whether the cache
+    was hit, the seconds spent here and the seconds the original
+    construction took.
+    """
+    fingerprint = data_fingerprint(X , y , columns , params)
+    path = os.path.join(cache_dir , f"{fingerprint}.bin")
+    meta_path = os.path.join(cache_dir , f"{fingerprint}.json")
+
+    start = time.perf_counter()
+    if os.path.exists(path) and os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+        dataset = lgb.Dataset(path , params=params).construct()
+        seconds = time.perf_counter() - start
+        logger.info(f"Loaded binned dataset {fingerprint} in {seconds:.3f}s (building it took {meta['construct_seconds']:.3f}s)")
+        return dataset , {'fingerprint': fingerprint , 'cache_hit': True , 'seconds': seconds , 'construct_seconds': meta['construct_seconds']}
+
+    dataset = lgb.Dataset(
+        np.asarray(X , dtype=np.float32) , label=np.asarray(y) , feature_name=list(columns) ,
+        params=params , free_raw_data=False
+    ).construct()
+    construct_seconds = time.perf_counter() - start
+
+    os.makedirs(cache_dir , exist_ok=True)
+    staging = os.path.join(cache_dir , f".{fingerprint}.bin.tmp")
+    if os.path.exists(staging):
+        os.remove(staging)
+    dataset.save_binary(staging)
+    os.replace(staging , path)
+    with open(meta_path , "w") as f:
+        json.dump({
+            "fingerprint": fingerprint,
+            "n_rows": int(len(X)),
+            "columns": list(columns),
+            "params": params,
+            "construct_seconds": construct_seconds,
+            "created_at": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        } , f , indent=2)
+
+    logger.info(f"Built and cached binned dataset {fingerprint} in {construct_seconds:.3f}s")
+    return dataset , {'fingerprint': fingerprint , 'cache_hit': False , 'seconds': construct_seconds , 'construct_seconds': construct_seconds}
+
+
+def classifier_from_booster(booster , y , **params):
+    """LGBMClassifier serving a Booster trained with lgb.train on labels `y`,
+    so it predicts, pickles and continues training like a fitted one.
+
+    Sets the fitted state LGBMClassifier.fit would (private attributes of
+    lightgbm.sklearn, hence the upper bound on lightgbm in pyproject.toml;
+    tests/test_dataset_cache.py checks it against booster.predict).
+    """
+    model = lgb.LGBMClassifier(**params)
+    encoder = LabelEncoder().fit(y)
+    model._le = encoder
+    model._classes = encoder.classes_
+    model._n_classes = len(encoder.classes_)
+    model._class_map = dict(zip(encoder.classes_ , encoder.transform(encoder.classes_)))
+    model._class_weight = None
+    model._objective = params.get('objective')
+    model._Booster = booster
+    model._n_features = model._n_features_in = booster.num_feature()
+    model._fitted_with_feature_names = booster.feature_name() != [f"Column_{i}" for i in range(booster.num_feature())]
+    model._evals_result = {}
+    model._best_iteration = booster.best_iteration
+    model._best_score = booster.best_score
+    model.fitted_ = True
+    booster.free_dataset()
+    return model
+
+
+def prune_datasets(cache_dir=DATASET_CACHE_DIR , keep=3):
+    """Remove all but the `keep` most recently written datasets"""
+    metas = sorted(
+        (name for name in os.listdir(cache_dir) if name.endswith(".json")),
+        key=lambda name: os.path.getmtime(os.path.join(cache_dir , name)),
+    )
+    for name in metas[:-keep]:
+        fingerprint = name[:-len(".json")]
+        for filename in (name , f"{fingerprint}.bin"):
+            path = os.path.join(cache_dir , filename)
+            if os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,121 @@
+import threading
+import time
+import numpy as np
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class DriftMonitor:
+    """Sliding-window drift detection off the request path.
+
+    Requests only copy their feature rows into a ring buffer. A background
+    thread runs the detector over the most recent `window_size` rows every
+    `check_every` new rows or every `interval` seconds, whichever comes
+    first, and hands the detector's result to `on_result`.
+    """
+
+    def __init__(self , detector , n_features , transform=None , on_result=None ,
+                 window_size=1000 , min_rows=100 , check_every=250 , interval=30.0):
+        self.detector = detector
+        self.transform = transform
+        self.on_result = on_result
+
+        self.window_size = window_size
+        self.min_rows = min_rows
+        self.check_every = check_every
+        self.interval = interval
+
+        self.buffer = np.zeros((window_size , n_features) , dtype=np.float32)
+        self.position = 0
+        self.filled = 0
+        self.pending = 0
+
+        self.last_result = None
+        self.last_checked = None
+
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def add(self , rows):
+        """Copy rows into the ring buffer; never runs the detector"""
+        rows = np.atleast_2d(rows)[-self.window_size:]
+        n = len(rows)
+
+        with self.lock:
+            end = self.position + n
+            if end <= self.window_size:
+                self.buffer[self.position:end] = rows
+            else:
+                split = self.window_size - self.position
+                self.buffer[self.position:] = rows[:split]
+                self.buffer[:n - split] = rows[split:]
+            self.position = end % self.window_size
+            self.filled = min(self.filled + n , self.window_size)
+            self.pending += n
+            due = self.pending >= self.check_every
+
+        if due:
+            self.wakeup.set()
+
+    def window(self):
+        """Buffered rows, oldest first"""
+        with self.lock:
+            if self.filled < self.window_size:
+                return self.buffer[:self.filled].copy()
+            return np.concatenate([self.buffer[self.position:] , self.buffer[:self.position]])
+
+    def check(self):
+        """Run the detector on the current window and publish the result"""
+        with self.lock:
+            self.pending = 0
+        window = self.window()
+        if len(window) < self.min_rows:
+            return None
+
+        start = time.perf_counter()
+        x = self.transform(window) if self.transform is not None else window
+        result = self.detector.predict(x).get('data' , {})
+        self.last_result = result
+        self.last_checked = time.time()
+        logger.info(f"Drift check on {len(window)} rows took {time.perf_counter() - start:.3f}s , is_drift={result.get('is_drift')}")
+
+        if self.on_result is not None:
+            self.on_result(result , len(window))
+        return result
+
+    def _run(self):
+        while not self.stopped.is_set():
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+            if self.stopped.is_set():
+                break
+            if self.pending == 0:
+                continue
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Error while checking drift {e}")
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run , name="drift-monitor" , daemon=True)
+            self.thread.start()
+        return self
+
+    def after_fork(self):
+        """Fresh lock, events and thread in a forked child process"""
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = None
+        return self.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.wakeup.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
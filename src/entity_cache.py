@@ -0,0 +1,78 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after `ttl` seconds.
+
+    Holds at most `maxsize` entries, evicting the least recently used one.
+    Every lookup counts as a hit or a miss; `on_lookup(hits, misses)` is
+    called with the counts of each get/get_many so callers can export them.
+    """
+
+    def __init__(self , maxsize=10000 , ttl=300.0 , on_lookup=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.on_lookup = on_lookup
+
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self , key , now):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires , value = entry
+        if expires < now:
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    def get_many(self , keys):
+        """{key: value} for the keys that are cached and not expired"""
+        now = time.monotonic()
+        found = {}
+        with self.lock:
+            for key in keys:
+                value = self._lookup(key , now)
+                if value is not None:
+                    found[key] = value
+            hits = len(found)
+            misses = len(keys) - hits
+            self.hits += hits
+            self.misses += misses
+
+        if self.on_lookup is not None:
+            self.on_lookup(hits , misses)
+        return found
+
+    def get(self , key):
+        return self.get_many([key]).get(key)
+
+    def put_many(self , items):
+        expires = time.monotonic() + self.ttl
+        with self.lock:
+            for key , value in items:
+                self.entries[key] = (expires , value)
+                self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def put(self , key , value):
+        self.put_many([(key , value)])
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def hit_ratio(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
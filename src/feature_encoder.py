@@ -0,0 +1,130 @@
+import numpy as np
+
+# Form field -> source column
+FORM_FIELDS = {
+    'contacts_count': 'Contacts_Count_12_mon',
+    'months_inactive': 'Months_Inactive_12_mon',
+    'dependent_count': 'Dependent_count',
+    'customer_age': 'Customer_Age',
+    'months_on_book': 'Months_on_book',
+    'avg_open_to_buy': 'Avg_Open_To_Buy',
+    'credit_limit': 'Credit_Limit',
+    'total_amt_chng': 'Total_Amt_Chng_Q4_Q1',
+    'total_relationship_count': 'Total_Relationship_Count',
+    'total_trans_amt': 'Total_Trans_Amt',
+    'avg_utilization_ratio': 'Avg_Utilization_Ratio',
+    'total_revolving_bal': 'Total_Revolving_Bal',
+    'total_ct_chng': 'Total_Ct_Chng_Q4_Q1',
+    'total_trans_ct': 'Total_Trans_Ct',
+    'gender': 'Gender',
+    'education_level': 'Education_Level',
+    'marital_status': 'Marital_Status',
+    'income_category': 'Income_Category',
+    'card_category': 'Card_Category',
+}
+
+
+class FeatureEncoder:
+    """Table-driven encoder from input fields to model input rows.
+
+    Built from a fitted FeatureTransformer: every field is resolved to its
+    column index in the transformer's ``feature_columns`` once, so encoding
+    writes straight into a float32 row (or block of rows) without building
+    an intermediate dict or DataFrame. ``fields`` maps input field names to
+    source columns (the /predict form fields by default); with None the
+    records are keyed by the source column names themselves.
+    Category values outside the fitted vocabulary (the reference category
+    or anything unseen) leave every one-hot column at 0. Numeric fields are
+    parsed as floats whatever the column's dtype, so "1000.5" is accepted and
+    1234.7 is not truncated, by every encode method alike.
+    """
+
+    def __init__(self, transformer, fields=FORM_FIELDS):
+        self.feature_columns = list(transformer.feature_columns)
+        self.n_features = len(self.feature_columns)
+
+        index = {column: i for i, column in enumerate(self.feature_columns)}
+        field_names = {column: column for column in transformer.source_columns} if fields is None else \
+            {column: field for field, column in fields.items()}
+
+        self.numeric = [
+            (field_names[column], index[column])
+            for column in transformer.numeric
+        ]
+        self.binary = [
+            (field_names[column], index[column], positive)
+            for column, positive in transformer.binary.items()
+        ]
+        self.categorical = [
+            (field_names[column], {value: index[transformer.one_hot_column(column, value)] for value in categories})
+            for column, categories in transformer.vocabularies.items()
+        ]
+
+    def allocate(self, n_rows):
+        return np.zeros((n_rows, self.n_features), dtype=np.float32)
+
+    def encode(self, record, out=None):
+        """Encode one record into ``out`` (or a new row) and return it"""
+        if out is None:
+            row = np.zeros(self.n_features, dtype=np.float32)
+        else:
+            row = out
+            row.fill(0)
+        return self._write(record, row)
+
+    def _write(self, record, row):
+        """Write a record's non-zero entries into an already-zeroed row"""
+        for field, idx in self.numeric:
+            row[idx] = float(record.get(field, 0))
+
+        for field, idx, positive in self.binary:
+            row[idx] = record.get(field) == positive
+
+        for field, lookup in self.categorical:
+            idx = lookup.get(record.get(field))
+            if idx is not None:
+                row[idx] = 1
+
+        return row
+
+    def encode_records(self, records, out=None):
+        """Encode a sequence of records into an (n, n_features) block"""
+        if out is None:
+            block = self.allocate(len(records))
+        else:
+            block = out
+            block.fill(0)
+        for row, record in zip(block, records):
+            self._write(record, row)
+        return block
+
+    def encode_columns(self, columns, out=None):
+        """Encode a columnar batch, ``{field: sequence of values}``.
+
+        Each field is converted with one vectorised operation; missing fields
+        are left at 0 like in :meth:`encode`.
+        """
+        n_rows = len(next(iter(columns.values()))) if columns else 0
+        block = self.allocate(n_rows) if out is None else out
+        if out is not None:
+            block.fill(0)
+
+        for field, idx in self.numeric:
+            values = columns.get(field)
+            if values is not None:
+                block[:, idx] = np.asarray(values, dtype=np.float64)
+
+        for field, idx, positive in self.binary:
+            values = columns.get(field)
+            if values is not None:
+                block[:, idx] = np.asarray(values, dtype=object) == positive
+
+        for field, lookup in self.categorical:
+            values = columns.get(field)
+            if values is None:
+                continue
+            values = np.asarray(values, dtype=object)
+            for value, idx in lookup.items():
+                block[:, idx] = values == value
+
+        return block
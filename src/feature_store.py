@@ -1,9 +1,56 @@
 import redis
 import json
+import struct
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from config.feature_config import FEATURE_COLUMNS, LABEL_COLUMN
+
+# Set of every entity id written through the store
+ENTITY_INDEX_KEY = "entity:index"
+# Set once the index also holds every entity written before it existed;
+# until then readers fall back to SCAN
+ENTITY_INDEX_COMPLETE_KEY = "entity:index:complete"
+
+# Binary values: MAGIC, a schema id byte, then the schema's columns as
+# little-endian float32. Never change a published schema, add a new id.
+BINARY_MAGIC = 0xFE
+BINARY_HEADER = struct.Struct("<BB")
+BINARY_DTYPE = np.dtype("<f4")
+FEATURE_SCHEMAS = {
+    1: tuple([LABEL_COLUMN] + FEATURE_COLUMNS),
+}
+CURRENT_SCHEMA_ID = 1
+
+
+def encode_features(features , schema_id=CURRENT_SCHEMA_ID):
+    """Pack a features dict as a schema-versioned float32 vector.
+
+    Dicts carrying keys outside the schema are stored as JSON instead.
+    """
+    schema = FEATURE_SCHEMAS[schema_id]
+    if not features.keys() <= set(schema):
+        return json.dumps(features).encode()
+
+    values = np.array([features.get(column , np.nan) for column in schema] , dtype=BINARY_DTYPE)
+    return BINARY_HEADER.pack(BINARY_MAGIC , schema_id) + values.tobytes()
+
+
+def decode_features(value):
+    """Read a stored value in either the binary or the legacy JSON layout"""
+    if value is None:
+        return None
+    if value[0] == BINARY_MAGIC:
+        schema = FEATURE_SCHEMAS[value[1]]
+        values = np.frombuffer(value , dtype=BINARY_DTYPE , offset=BINARY_HEADER.size).tolist()
+        # NaN marks a column that was missing when the entity was written
+        return {column: v for column , v in zip(schema , values) if v == v}
+    return json.loads(value)
+
 
 class RedisFeatureStore:
-    def __init__(self , host="localhost" , port = 6379 , db=0):
+    def __init__(self , host="localhost" , port = 6379 , db=0 , chunk_size=1000 , max_workers=None , value_format="binary"):
 
+        self.connection = {"host": host , "port": port , "db": db}
         self.client = redis.StrictRedis(
             host=host,
             port=port,
@@ -11,35 +58,304 @@ class RedisFeatureStore:
             decode_responses=True
         )
 
+        # Feature values are bytes (binary layout), so they go through a
+        # client that does not decode responses
+        self.raw_client = redis.StrictRedis(
+            host=host,
+            port=port,
+            db=db,
+            decode_responses=False
+        )
+
+        if value_format not in ("binary" , "json"):
+            raise ValueError(f"Unknown value_format {value_format}")
+        self.value_format = value_format
+
+        # Batch operations send `chunk_size` commands per round trip and
+        # optionally run up to `max_workers` chunks concurrently
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+
+        # Whether this client has seen the index completeness marker
+        self.index_complete = False
+
+    @staticmethod
+    def _key(entity_id):
+        return f"entity:{entity_id}:features"
+
+    def feature_keys(self , entity_ids):
+        return [self._key(entity_id) for entity_id in entity_ids]
+
+    def async_raw_client(self):
+        """redis.asyncio client for the same server that does not decode
+        responses, for reading feature values from an event loop"""
+        import redis.asyncio
+        return redis.asyncio.Redis(**self.connection , decode_responses=False)
+
+    def _encode(self , features):
+        if self.value_format == "json":
+            return json.dumps(features)
+        return encode_features(features)
+
+    def ensure_entity_index(self):
+        """Backfill the entity index before the first write to a store that
+        has no completeness marker, so older entities are never hidden
+        behind an index holding only the new ones"""
+        if self.index_complete:
+            return
+        if not self.client.exists(ENTITY_INDEX_COMPLETE_KEY):
+            self.backfill_entity_index()
+        self.index_complete = True
+
     # Storing row by row
     def store_features(self,entity_id,features):
-        key = f"entity:{entity_id}:features"
-        self.client.set(key , json.dumps(features))
+        self.ensure_entity_index()
+        key = self._key(entity_id)
+        pipe = self.raw_client.pipeline(transaction=False)
+        pipe.set(key , self._encode(features))
+        pipe.sadd(ENTITY_INDEX_KEY , entity_id)
+        pipe.execute()
 
     # Getting row one by one
     def get_features(self,entity_id):
-        key = f"entity:{entity_id}:features"
-        features = self.client.get(key)
+        key = self._key(entity_id)
+        features = self.raw_client.get(key)
         if features:
-            return json.loads(features)
+            return decode_features(features)
         return None
-    
-    def store_batch_features(self,batch_data):
-        for entity_id , features in batch_data.items():
-            self.store_features(entity_id,features)
 
-    def get_batch_features(self,entity_ids):
+    def _run_chunks(self, fn, items, chunk_size=None, max_workers=None):
+        """Apply `fn` to consecutive chunks of `items`, results in input order"""
+        chunk_size = chunk_size or self.chunk_size
+        max_workers = max_workers if max_workers is not None else self.max_workers
+
+        chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+        if max_workers and max_workers > 1 and len(chunks) > 1:
+            # redis-py's connection pool hands each thread its own connection
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                return list(pool.map(fn, chunks))
+        return [fn(chunk) for chunk in chunks]
+
+    def store_batch_features(self,batch_data , chunk_size=None , max_workers=None):
+        self.ensure_entity_index()
+
+        def write_chunk(chunk):
+            pipe = self.raw_client.pipeline(transaction=False)
+            for entity_id , features in chunk:
+                pipe.set(self._key(entity_id) , self._encode(features))
+            pipe.sadd(ENTITY_INDEX_KEY , *[entity_id for entity_id , _ in chunk])
+            pipe.execute()
+
+        self._run_chunks(write_chunk , list(batch_data.items()) , chunk_size , max_workers)
+
+    def store_matrix(self , entity_ids , matrix , columns , chunk_size=None , max_workers=None):
+        """Store a block of rows without building a dict per entity.
+
+        When `columns` is a known schema the rows are packed as float32
+        slices of one buffer; otherwise they fall back to store_batch_features.
+        """
+        columns = tuple(columns)
+        schema_id = next((sid for sid , schema in FEATURE_SCHEMAS.items() if schema == columns) , None)
+        entity_ids = [str(entity_id) for entity_id in entity_ids]
+
+        if self.value_format != "binary" or schema_id is None:
+            rows = np.asarray(matrix , dtype=np.float64).tolist()
+            batch = {entity_id: dict(zip(columns , row)) for entity_id , row in zip(entity_ids , rows)}
+            return self.store_batch_features(batch , chunk_size , max_workers)
+
+        self.ensure_entity_index()
+        header = BINARY_HEADER.pack(BINARY_MAGIC , schema_id)
+        buffer = np.ascontiguousarray(matrix , dtype=BINARY_DTYPE).tobytes()
+        stride = len(columns) * BINARY_DTYPE.itemsize
+
+        def write_chunk(chunk):
+            pipe = self.raw_client.pipeline(transaction=False)
+            for i , entity_id in chunk:
+                pipe.set(self._key(entity_id) , header + buffer[i * stride:(i + 1) * stride])
+            pipe.sadd(ENTITY_INDEX_KEY , *[entity_id for _ , entity_id in chunk])
+            pipe.execute()
+
+        self._run_chunks(write_chunk , list(enumerate(entity_ids)) , chunk_size , max_workers)
+
+    def get_batch_features(self,entity_ids , chunk_size=None , max_workers=None):
+        entity_ids = list(entity_ids)
+
+        def read_chunk(chunk):
+            return self.raw_client.mget([self._key(entity_id) for entity_id in chunk])
+
+        values = self._run_chunks(read_chunk , entity_ids , chunk_size , max_workers)
+
         batch_features={}
-        for entity_id in entity_ids:
-            batch_features[entity_id] = self.get_features(entity_id)
+        for entity_id , features in zip(entity_ids , (v for chunk in values for v in chunk)):
+            batch_features[entity_id] = decode_features(features) if features else None
         return batch_features
-    
+
+    def iter_entity_id_pages(self , page_size=None):
+        """Yield entity ids page by page without blocking the server.
+
+        Walks the entity index with SSCAN once it is marked complete, or
+        falls back to a SCAN over the feature keys for stores written before
+        the index existed. Like any SCAN, an id may occasionally be yielded
+        twice.
+        """
+        page_size = page_size or self.chunk_size
+
+        if self.client.exists(ENTITY_INDEX_COMPLETE_KEY):
+            cursor = 0
+            while True:
+                cursor , entity_ids = self.client.sscan(ENTITY_INDEX_KEY , cursor , count=page_size)
+                if entity_ids:
+                    yield entity_ids
+                if cursor == 0:
+                    break
+        else:
+            cursor = 0
+            while True:
+                cursor , keys = self.client.scan(cursor , match='entity:*:features' , count=page_size)
+                ### entity entity_id feature
+                if keys:
+                    yield [key.split(':')[1] for key in keys]
+                if cursor == 0:
+                    break
+
+    def iter_entity_ids(self , page_size=None):
+        for entity_ids in self.iter_entity_id_pages(page_size):
+            yield from entity_ids
+
     def get_all_entity_ids(self):
-        keys = self.client.keys('entity:*:features')
+        # dict.fromkeys drops the rare SCAN duplicate while keeping order
+        return list(dict.fromkeys(self.iter_entity_ids()))
+
+    def count_entities(self):
+        if self.client.exists(ENTITY_INDEX_COMPLETE_KEY):
+            return self.client.scard(ENTITY_INDEX_KEY)
+        return len(self.get_all_entity_ids())
+
+    def backfill_entity_index(self , page_size=None):
+        """Add every feature key's entity to the index (SCAN based), then
+        mark the index complete. Only adds, so concurrent writes are kept."""
+        cursor = 0
+        while True:
+            cursor , keys = self.client.scan(cursor , match='entity:*:features' , count=page_size or self.chunk_size)
+            if keys:
+                self.client.sadd(ENTITY_INDEX_KEY , *[key.split(':')[1] for key in keys])
+            if cursor == 0:
+                break
+        self.client.set(ENTITY_INDEX_COMPLETE_KEY , 1)
+        self.index_complete = True
+        return self.client.scard(ENTITY_INDEX_KEY)
+
+    def rebuild_entity_index(self , page_size=None):
+        """Rebuild the entity index from the feature keys, dropping ids whose
+        features are gone; readers use SCAN while it runs"""
+        self.client.delete(ENTITY_INDEX_COMPLETE_KEY , ENTITY_INDEX_KEY)
+        return self.backfill_entity_index(page_size)
+
+    def _schema_take(self , schema_id , columns):
+        schema = FEATURE_SCHEMAS[schema_id]
+        return np.array([schema.index(column) for column in columns])
+
+    def _write_page(self , X , y , values , columns , label_column , take_cache):
+        """Decode stored values into the rows of `X` (and `y`)"""
+        first = values[0]
+        header = first[:BINARY_HEADER.size]
+        if first[0] == BINARY_MAGIC and all(value[:BINARY_HEADER.size] == header for value in values):
+            # Whole page in one binary schema: one buffer, one gather
+            schema_id = first[1]
+            if schema_id not in take_cache:
+                take_cache[schema_id] = self._schema_take(schema_id , columns + ([label_column] if label_column else []))
+            take = take_cache[schema_id]
+            block = np.frombuffer(
+                b"".join(value[BINARY_HEADER.size:] for value in values) , dtype=BINARY_DTYPE
+            ).reshape(len(values) , len(FEATURE_SCHEMAS[schema_id]))
+            X[:] = block[: , take[:len(columns)]]
+            if label_column:
+                y[:] = block[: , take[-1]]
+        else:
+            for i , value in enumerate(values):
+                features = decode_features(value)
+                X[i] = [features.get(column , np.nan) for column in columns]
+                if label_column:
+                    y[i] = features.get(label_column , np.nan)
+
+    def decode_matrix(self , entity_ids , values , columns=FEATURE_COLUMNS , label_column=None):
+        """Same as export_matrix for feature values already read (an MGET of
+        feature_keys(entity_ids) on another client); None values are skipped"""
+        columns = list(columns)
+        present = [(entity_id , value) for entity_id , value in zip(entity_ids , values) if value]
+        X = np.empty((len(present) , len(columns)) , dtype=BINARY_DTYPE)
+        y = np.empty(len(present) , dtype=BINARY_DTYPE)
+        if present:
+            self._write_page(X , y , [value for _ , value in present] , columns , label_column , {})
+        return [entity_id for entity_id , _ in present] , X , (y if label_column else None)
+
+    def export_matrix(self , columns=FEATURE_COLUMNS , label_column=LABEL_COLUMN , entity_ids=None , page_size=None , order="C"):
+        """Stream entities into a preallocated float32 matrix.
+
+        Pages through the store (or `entity_ids`) and writes each page of
+        values straight into `X` in `columns` order, plus a label vector `y`
+        when `label_column` is set. Entities without stored features are
+        skipped. Returns (entity_ids, X, y).
+        """
+        columns = list(columns)
+        take_cache = {}
+
+        if entity_ids is not None:
+            entity_ids = list(entity_ids)
+            page_size = page_size or self.chunk_size
+            pages = (entity_ids[i:i + page_size] for i in range(0 , len(entity_ids) , page_size))
+            capacity = len(entity_ids)
+        else:
+            pages = self.iter_entity_id_pages(page_size)
+            capacity = self.count_entities() or (page_size or self.chunk_size)
+
+        X = np.empty((capacity , len(columns)) , dtype=BINARY_DTYPE , order=order)
+        y = np.empty(capacity , dtype=BINARY_DTYPE)
+        ids = []
+        seen = set()
+        n = 0
+
+        for page in pages:
+            page = [entity_id for entity_id in page if entity_id not in seen]
+            seen.update(page)
+            values = self.raw_client.mget(self.feature_keys(page))
+            present = [(entity_id , value) for entity_id , value in zip(page , values) if value]
+            if not present:
+                continue
+
+            end = n + len(present)
+            if end > len(X):
+                size = max(2 * len(X) , end)
+                grown = np.empty((size , len(columns)) , dtype=BINARY_DTYPE , order=order)
+                grown[:n] = X[:n]
+                X = grown
+                y = np.resize(y , size)
+
+            self._write_page(X[n:end] , y[n:end] , [value for _ , value in present] , columns , label_column , take_cache)
+            ids.extend(entity_id for entity_id , _ in present)
+            n = end
+
+        return ids , X[:n] , (y[:n] if label_column else None)
 
-        ### entity entity_id feature
-        entity_ids = [key.split(':')[1] for key in keys ]
-        return entity_ids
+    def export_record_batch(self , columns=FEATURE_COLUMNS , label_column=LABEL_COLUMN , entity_ids=None , page_size=None):
+        """Same as export_matrix but as a pyarrow RecordBatch with an
+        `entity_id` column; the matrix is column-major so Arrow can wrap
+        each column without another copy."""
+        import pyarrow as pa
 
+        ids , X , y = self.export_matrix(columns , label_column , entity_ids , page_size , order="F")
+        arrays = [pa.array(ids , type=pa.string())] + [pa.array(X[: , j]) for j in range(X.shape[1])]
+        names = ["entity_id"] + list(columns)
+        if label_column:
+            arrays.append(pa.array(y))
+            names.append(label_column)
+        return pa.RecordBatch.from_arrays(arrays , names=names)
 
-    
+    def migrate_values(self , page_size=None):
+        """Rewrite every stored entity in the store's current value format"""
+        migrated = 0
+        for entity_ids in self.iter_entity_id_pages(page_size):
+            batch = {entity_id: features for entity_id , features in self.get_batch_features(entity_ids).items() if features}
+            self.store_batch_features(batch)
+            migrated += len(batch)
+        return migrated
@@ -0,0 +1,177 @@
+import os
+import json
+import numpy as np
+from src.feature_encoder import FeatureEncoder
+from src.logger import get_logger
+from config.feature_config import FEATURE_COLUMNS, NUMERIC_COLUMNS, BINARY_COLUMNS, CATEGORICAL_COLUMNS
+
+logger = get_logger(__name__)
+
+# Layout version of the saved JSON
+FORMAT_VERSION = 1
+
+
+class FeatureTransformer:
+    """Encoding of source columns into model features, fitted on the
+    training data and saved with the model.
+
+    Records the dtype of every numeric column, the positive value of every
+    binary column, the vocabulary of every categorical column and the order
+    of the encoded columns, so preprocessing and the service encode rows
+    the same way. The reference category of a column gets no one-hot
+    column, like get_dummies(drop_first=True).
+    """
+
+    def __init__(self , numeric=None , binary=None , vocabularies=None , references=None , feature_columns=None):
+        # column -> dtype name
+        self.numeric = dict(numeric or {})
+        # column -> value encoded as 1
+        self.binary = dict(binary or {})
+        # column -> categories that have a one-hot column
+        self.vocabularies = {column: list(values) for column , values in (vocabularies or {}).items()}
+        # column -> reference category seen at fit time (None if unknown)
+        self.references = dict(references or {})
+        self.feature_columns = list(feature_columns or [])
+        # column -> categories seen so far by fit / partial_fit (not saved)
+        self.observed = {}
+        self._encoder = None
+
+    @staticmethod
+    def one_hot_column(column , value):
+        return f"{column}_{value}"
+
+    @property
+    def source_columns(self):
+        return list(self.numeric) + list(self.binary) + list(self.vocabularies)
+
+    def fit(self , df , feature_columns=FEATURE_COLUMNS , numeric=NUMERIC_COLUMNS , binary=BINARY_COLUMNS , categorical=CATEGORICAL_COLUMNS):
+        """Record dtypes and vocabularies from a raw training frame.
+
+        With `feature_columns` the encoded columns follow that order (the one
+        the feature store and the models use) and only categories with a
+        column there are encoded; with None every category but the first
+        (sorted) gets a column. Raises ValueError if `feature_columns` holds
+        a column no source column produces.
+        """
+        self.numeric , self.vocabularies , self.references , self.observed = {} , {} , {} , {}
+        self.partial_fit(df , feature_columns , numeric , binary , categorical)
+        logger.info(f"Fitted feature transformer: {len(self.feature_columns)} features from {len(self.source_columns)} source columns")
+        return self
+
+    def partial_fit(self , df , feature_columns=FEATURE_COLUMNS , numeric=NUMERIC_COLUMNS , binary=BINARY_COLUMNS , categorical=CATEGORICAL_COLUMNS):
+        """Update dtypes and vocabularies with one chunk of the training data.
+
+        Numeric dtypes are widened across chunks (int64 then float64 gives
+        float64). With `feature_columns` the encoded columns are fixed up
+        front, so chunks encoded between calls encode the same way as after
+        the last one.
+        """
+        for column in numeric:
+            dtype = df[column].dtype
+            if dtype.kind not in 'iuf':
+                raise ValueError(f"Numeric column {column} has dtype {dtype}")
+            previous = self.numeric.get(column)
+            self.numeric[column] = str(dtype if previous is None else np.promote_types(previous , dtype))
+        self.binary = dict(binary)
+
+        for column in categorical:
+            seen = self.observed.setdefault(column , set())
+            new_values = set(df[column].dropna().astype(str).unique()) - seen
+            seen.update(new_values)
+            observed = sorted(seen)
+            if feature_columns is None:
+                encoded = observed[1:]
+            else:
+                prefix = self.one_hot_column(column , "")
+                encoded = sorted(name[len(prefix):] for name in feature_columns if name.startswith(prefix))
+            unencoded = [value for value in observed if value not in encoded]
+            if len(unencoded) > 1 and new_values.intersection(unencoded):
+                logger.warning(f"Categories {unencoded[1:]} of {column} have no feature column and encode like {unencoded[0]}")
+            self.vocabularies[column] = encoded
+            self.references[column] = unencoded[0] if unencoded else None
+
+        produced = list(self.numeric) + list(self.binary) + [
+            self.one_hot_column(column , value) for column , values in self.vocabularies.items() for value in values
+        ]
+        if feature_columns is None:
+            self.feature_columns = produced
+        else:
+            produced_set , wanted = set(produced) , set(feature_columns)
+            unknown = [column for column in feature_columns if column not in produced_set]
+            unused = [column for column in produced if column not in wanted]
+            if unknown or unused:
+                raise ValueError(f"Feature columns {unknown} are not produced by any source column , {unused} are not feature columns")
+            self.feature_columns = list(feature_columns)
+
+        self._encoder = None
+        return self
+
+    def encoder(self , fields=None):
+        """FeatureEncoder for records keyed by `fields` (source column names by default)"""
+        if fields is not None:
+            return FeatureEncoder(self , fields)
+        if self._encoder is None:
+            self._encoder = FeatureEncoder(self , None)
+        return self._encoder
+
+    def transform(self , df):
+        """float32 (n, n_features) matrix of a raw frame (or {column: values})"""
+        missing = [column for column in self.source_columns if column not in df]
+        if missing:
+            raise ValueError(f"Source columns {missing} are missing")
+        return self.encoder().encode_columns({column: np.asarray(df[column]) for column in self.source_columns})
+
+    def transform_row(self , record):
+        """float32 row of one record keyed by source column"""
+        return self.encoder().encode(record)
+
+    def check_columns(self , columns):
+        if self.feature_columns != list(columns):
+            raise ValueError("Feature transformer was fitted for a different feature column order")
+
+    def to_dict(self):
+        return {
+            "format_version": FORMAT_VERSION,
+            "numeric": self.numeric,
+            "binary": self.binary,
+            "vocabularies": self.vocabularies,
+            "references": self.references,
+            "feature_columns": self.feature_columns,
+        }
+
+    @classmethod
+    def from_dict(cls , data):
+        if data.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported feature transformer format {data.get('format_version')}")
+        return cls(data["numeric"] , data["binary"] , data["vocabularies"] , data["references"] , data["feature_columns"])
+
+    @classmethod
+    def from_feature_columns(cls , feature_columns=FEATURE_COLUMNS):
+        """Transformer implied by a feature column list, for models saved
+        before transformers were; numeric dtypes come from the config"""
+        vocabularies = {}
+        for column in CATEGORICAL_COLUMNS:
+            prefix = cls.one_hot_column(column , "")
+            vocabularies[column] = sorted(name[len(prefix):] for name in feature_columns if name.startswith(prefix))
+        return cls(
+            numeric={column: dtype for column , dtype in NUMERIC_COLUMNS.items() if column in feature_columns},
+            binary={column: positive for column , positive in BINARY_COLUMNS.items() if column in feature_columns},
+            vocabularies=vocabularies,
+            references={column: None for column in vocabularies},
+            feature_columns=feature_columns,
+        )
+
+    def save(self , path):
+        """Write the transformer as JSON, replacing `path` atomically"""
+        os.makedirs(os.path.dirname(path) or "." , exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path , "w") as f:
+            json.dump(self.to_dict() , f , indent=2)
+        os.replace(tmp_path , path)
+        logger.info(f"Feature transformer saved to {path}")
+        return path
+
+    @classmethod
+    def load(cls , path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
@@ -0,0 +1,24 @@
+import os
+import json
+import time
+from config.path_config import *
+
+
+def load_state(path=INCREMENTAL_STATE_PATH):
+    """State of the last successful pipeline run, {} before the first one"""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_state(state , path=INCREMENTAL_STATE_PATH):
+    """Write the state atomically; values that are not JSON (timestamps,
+    numpy scalars) are stored as strings"""
+    state = dict(state , updated_at=time.strftime('%Y-%m-%dT%H:%M:%S'))
+    os.makedirs(os.path.dirname(path) or "." , exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path , "w") as f:
+        json.dump(state , f , indent=2 , default=str)
+    os.replace(tmp_path , path)
+    return state
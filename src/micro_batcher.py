@@ -0,0 +1,95 @@
+import queue
+import threading
+import time
+import numpy as np
+from concurrent.futures import Future
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-row requests into one model call.
+
+    `submit` queues a row and returns a Future. A worker thread takes the
+    first queued row, keeps collecting until `max_batch_size` rows or
+    `max_wait_ms` after that first row, stacks them into one matrix and
+    calls `handler(matrix)`, which must return one result per row. Results
+    (or the handler's exception) are fanned back to each Future.
+    `on_batch(batch_size, queue_delays)` is called after every batch.
+    """
+
+    def __init__(self , handler , max_batch_size=32 , max_wait_ms=2.0 , on_batch=None):
+        self.handler = handler
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.on_batch = on_batch
+
+        self.queue = queue.Queue()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def submit(self , row):
+        future = Future()
+        self.queue.put((row , future , time.perf_counter()))
+        return future
+
+    def _collect(self):
+        first = self.queue.get()
+        if first is None:
+            return []
+        batch = [first]
+        deadline = first[2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self.stopped.set()
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while not self.stopped.is_set():
+            batch = self._collect()
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            rows = np.stack([np.asarray(row).reshape(-1) for row , _ , _ in batch])
+            try:
+                results = self.handler(rows)
+                for (_ , future , _) , result in zip(batch , results):
+                    future.set_result(result)
+            except Exception as e:
+                logger.error(f"Error while scoring micro-batch {e}")
+                for _ , future , _ in batch:
+                    future.set_exception(e)
+
+            if self.on_batch is not None:
+                self.on_batch(len(batch) , [started - enqueued for _ , _ , enqueued in batch])
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run , name="micro-batcher" , daemon=True)
+            self.thread.start()
+        return self
+
+    def after_fork(self):
+        """Fresh queue and worker thread in a forked child process"""
+        self.queue = queue.Queue()
+        self.stopped = threading.Event()
+        self.thread = None
+        return self.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.queue.put(None)
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
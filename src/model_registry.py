@@ -0,0 +1,205 @@
+import sys
+import os
+import json
+import time
+import pickle
+import shutil
+import hashlib
+import threading
+from src.logger import get_logger
+from src.custom_exception import CustomException
+from src.reference_snapshot import resolve_snapshot_dir
+from src.feature_transformer import FeatureTransformer
+from config.path_config import *
+from config.feature_config import FEATURE_COLUMNS
+
+logger = get_logger(__name__)
+
+# Pointer file naming the model version the service should serve
+CURRENT_FILE = "CURRENT"
+# Fitted feature transformer stored next to model.pkl
+TRANSFORMER_FILE = "feature_transformer.json"
+
+
+def register_model(model_path , registry_dir=MODEL_REGISTRY_DIR , reference_dir=REFERENCE_DIR , columns=FEATURE_COLUMNS , activate=True ,
+                   transformer_path=FEATURE_TRANSFORMER_PATH):
+    """Copy a pickled model into the registry under its content hash.
+
+    A version directory holds `model.pkl`, the feature transformer the
+    training data was encoded with and `meta.json`, which records the
+    feature columns and the reference snapshot (scaler + drift reference)
+    the model goes with. CURRENT is switched to it only once all files are
+    written. Registering the same file twice is a no-op.
+    """
+    try:
+        with open(model_path , "rb") as f:
+            data = f.read()
+        version = hashlib.sha256(data).hexdigest()[:12]
+        version_dir = os.path.join(registry_dir , version)
+
+        if not os.path.isdir(version_dir):
+            os.makedirs(registry_dir , exist_ok=True)
+            staging_dir = os.path.join(registry_dir , f".{version}.tmp")
+            os.makedirs(staging_dir , exist_ok=True)
+
+            with open(os.path.join(staging_dir , "model.pkl") , "wb") as f:
+                f.write(data)
+            has_transformer = transformer_path is not None and os.path.exists(transformer_path)
+            if has_transformer:
+                transformer = FeatureTransformer.load(transformer_path)
+                transformer.check_columns(columns)
+                transformer.save(os.path.join(staging_dir , TRANSFORMER_FILE))
+            with open(os.path.join(staging_dir , "meta.json") , "w") as f:
+                json.dump({
+                    "version": version,
+                    "sha256": hashlib.sha256(data).hexdigest(),
+                    "columns": list(columns),
+                    "transformer": TRANSFORMER_FILE if has_transformer else None,
+                    "reference_version": os.path.basename(resolve_snapshot_dir(reference_dir)) if os.path.isdir(reference_dir) else None,
+                    "created_at": time.strftime('%Y-%m-%dT%H:%M:%S'),
+                } , f , indent=2)
+            os.replace(staging_dir , version_dir)
+            logger.info(f"Registered model {version} from {model_path}")
+
+        if activate:
+            activate_model(version , registry_dir)
+        return version
+
+    except Exception as e:
+        logger.error(f"Error while registering model {e}")
+        raise CustomException(str(e) , sys)
+
+
+def activate_model(version , registry_dir=MODEL_REGISTRY_DIR):
+    """Point CURRENT at an already registered version (also used to roll back)"""
+    if not os.path.isdir(os.path.join(registry_dir , version)):
+        raise FileNotFoundError(f"Model version {version} is not registered")
+    pointer_tmp = os.path.join(registry_dir , f".{CURRENT_FILE}.tmp")
+    with open(pointer_tmp , "w") as f:
+        f.write(version)
+    os.replace(pointer_tmp , os.path.join(registry_dir , CURRENT_FILE))
+    logger.info(f"Model {version} is now current")
+
+
+def current_version(registry_dir=MODEL_REGISTRY_DIR):
+    """Version CURRENT points at, None for an empty registry"""
+    try:
+        with open(os.path.join(registry_dir , CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def registered_meta(registry_dir=MODEL_REGISTRY_DIR , version=None):
+    """meta.json of `version`, the current one by default"""
+    version = version or current_version(registry_dir)
+    if version is None:
+        raise FileNotFoundError(f"No current model in {registry_dir}")
+    with open(os.path.join(registry_dir , version , "meta.json")) as f:
+        return json.load(f)
+
+
+def load_registered_model(registry_dir=MODEL_REGISTRY_DIR , version=None , columns=FEATURE_COLUMNS):
+    """Load (model, meta) for `version`, the current one by default.
+
+    The file's hash is checked against its version, and its feature columns
+    against `columns`.
+    """
+    version = version or current_version(registry_dir)
+    if version is None:
+        raise FileNotFoundError(f"No current model in {registry_dir}")
+    version_dir = os.path.join(registry_dir , version)
+
+    with open(os.path.join(version_dir , "meta.json")) as f:
+        meta = json.load(f)
+    if meta["columns"] != list(columns):
+        raise ValueError(f"Model {version} was trained on a different feature column order")
+
+    with open(os.path.join(version_dir , "model.pkl") , "rb") as f:
+        data = f.read()
+    if hashlib.sha256(data).hexdigest() != meta["sha256"]:
+        raise ValueError(f"Model file of {version} does not match its hash")
+
+    return pickle.loads(data) , meta
+
+
+def load_registered_transformer(registry_dir=MODEL_REGISTRY_DIR , version=None , columns=FEATURE_COLUMNS):
+    """FeatureTransformer registered with `version`, the current one by
+    default. Versions registered without one get the transformer implied by
+    `columns`."""
+    meta = registered_meta(registry_dir , version)
+    version = meta["version"]
+
+    if not meta.get("transformer"):
+        return FeatureTransformer.from_feature_columns(columns)
+    transformer = FeatureTransformer.load(os.path.join(registry_dir , version , meta["transformer"]))
+    transformer.check_columns(columns)
+    return transformer
+
+
+def prune_models(registry_dir=MODEL_REGISTRY_DIR , keep=5):
+    """Remove all but the `keep` most recently registered versions"""
+    current = current_version(registry_dir)
+    versions = sorted(
+        (name for name in os.listdir(registry_dir)
+         if os.path.isdir(os.path.join(registry_dir , name)) and not name.startswith(".")),
+        key=lambda name: os.path.getmtime(os.path.join(registry_dir , name)),
+    )
+    for name in versions[:-keep]:
+        if name != current:
+            shutil.rmtree(os.path.join(registry_dir , name))
+
+
+class RegistryWatcher:
+    """Polls the registry's CURRENT pointer and calls `on_change(version)`
+    from a background thread whenever it names a new version"""
+
+    def __init__(self , on_change , registry_dir=MODEL_REGISTRY_DIR , interval=5.0 , version=None):
+        self.on_change = on_change
+        self.registry_dir = registry_dir
+        self.interval = interval
+        self.version = version
+
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def poll(self):
+        version = current_version(self.registry_dir)
+        if version is None or version == self.version:
+            return False
+        logger.info(f"Model registry switched from {self.version} to {version}")
+        # Only remember the version once it has been applied, so a failed
+        # swap is retried on the next poll
+        self.on_change(version)
+        self.version = version
+        return True
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"Error while applying model {current_version(self.registry_dir)} {e}")
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run , name="registry-watcher" , daemon=True)
+            self.thread.start()
+        return self
+
+    def after_fork(self):
+        """Fresh event and thread in a forked child process"""
+        self.stopped = threading.Event()
+        self.thread = None
+        return self.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+
+if __name__=="__main__":
+    register_model(os.path.join(MODEL_PATH , "lgb_model.pkl"))
+    prune_models()
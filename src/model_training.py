@@ -1,24 +1,78 @@
+import sys
 from src.logger import get_logger
 from src.custom_exception import CustomException
 import pandas as pd
+import numpy as np
 from src.feature_store import RedisFeatureStore
-from sklearn.model_selection import train_test_split, GridSearchCV
+from sklearn.model_selection import GridSearchCV
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import HalvingGridSearchCV
 import lightgbm as lgb
 import os
 import pickle
+import time
+from itertools import product
 from config.path_config import *
+from config.feature_config import FEATURE_COLUMNS, LABEL_COLUMN
+from src.artifact_io import read_frame
+from src.dataset_cache import DATASET_PARAMS, classifier_from_booster, load_or_build_dataset, prune_datasets
+from src.data_ingestion import hash_split_mask
 from sklearn.metrics import accuracy_score
 import mlflow
 import mlflow.sklearn
 
 logger = get_logger(__name__)
 
+# grid: exhaustive GridSearchCV over PARAM_GRID.
+# halving: successive halving, every candidate starts with a few trees and
+# only the best third moves on to three times as many, up to MAX_ESTIMATORS.
+# dataset_cv: lgb.cv on one binned Dataset (cached on disk by data
+# fingerprint) shared by every candidate and fold; the number of trees is
+# the round with the lowest validation error, up to MAX_ESTIMATORS.
+SEARCH_MODES = ("grid" , "halving" , "dataset_cv")
+PARAM_GRID = {
+    'num_leaves': [5, 20, 31],
+    'learning_rate': [0.05, 0.1, 0.2],
+    'n_estimators': [50, 100, 150]
+}
+MAX_ESTIMATORS = max(PARAM_GRID['n_estimators'])
+# What an incremental update has to match on the holdout to be kept:
+# previous: the model it continues (a full retrain only when it falls short)
+# full_retrain: a full retrain with the same hyperparameters, fitted on every run
+INCREMENTAL_GUARDS = ("previous" , "full_retrain")
+
 class ModelTraining:
 
-    def __init__(self , feature_store:RedisFeatureStore , model_save_path = MODEL_PATH ):
+    def __init__(self , feature_store:RedisFeatureStore , model_save_path = MODEL_PATH , search_mode="grid" , n_jobs=-1 , cv=5 , dataset_cache_dir=DATASET_CACHE_DIR ,
+                 incremental_estimators=50 , incremental_tolerance=0.005 , incremental_guard="previous" , data_source="feature_store" , processed_path=PROCESSED_FEATURES):
         self.feature_store = feature_store
+        # Training matrix from the feature store, or from the processed
+        # Parquet dataset DataProcessing writes
+        if data_source not in ("feature_store" , "parquet"):
+            raise ValueError(f"Unknown data_source {data_source}")
+        self.data_source = data_source
+        self.processed_path = processed_path
         self.model_save_path = model_save_path
         self.model = None
+        self.train_ids = None
+        self.test_ids = None
+
+        # Incremental runs add `incremental_estimators` trees on the changed
+        # customers and keep them only if holdout accuracy is within
+        # `incremental_tolerance` of the `incremental_guard` model
+        if incremental_guard not in INCREMENTAL_GUARDS:
+            raise ValueError(f"Unknown incremental_guard {incremental_guard}")
+        self.incremental_estimators = incremental_estimators
+        self.incremental_tolerance = incremental_tolerance
+        self.incremental_guard = incremental_guard
+
+        if search_mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search_mode {search_mode}")
+        self.search_mode = search_mode
+        # Candidates x folds run in `n_jobs` worker processes
+        self.n_jobs = n_jobs
+        self.cv = cv
+        self.dataset_cache_dir = dataset_cache_dir
 
         os.makedirs(self.model_save_path , exist_ok=True)
         logger.info("Model Training initialized...")
@@ -28,8 +82,8 @@ class ModelTraining:
             logger.info("Extracting data from Redis")
 
             data = []
-            for entity_id in entity_ids:
-                features = self.feature_store.get_features(entity_id)
+            batch_features = self.feature_store.get_batch_features(entity_ids)
+            for entity_id , features in batch_features.items():
                 if features:
                     data.append(features)
                 else:
@@ -37,67 +91,155 @@ class ModelTraining:
             return data
         except Exception as e:
             logger.error(f"Error while loading data from Redis {e}")
-            raise CustomException(str(e))
+            raise CustomException(str(e) , sys)
         
+    def load_matrix(self):
+        if self.data_source == "parquet":
+            # Column projection + memory-mapped read of the processed features
+            df = read_frame(self.processed_path , columns=["CLIENTNUM" , LABEL_COLUMN] + FEATURE_COLUMNS)
+            return df["CLIENTNUM"].astype(str).tolist() , df[FEATURE_COLUMNS].to_numpy(dtype=np.float32) , df[LABEL_COLUMN].to_numpy()
+        # Columnar export: one float32 matrix + label vector, no dict/DataFrame round trip
+        return self.feature_store.export_matrix(FEATURE_COLUMNS , label_column=LABEL_COLUMN)
+
     def prepare_data(self):
         try:
-            entity_ids = self.feature_store.get_all_entity_ids()
-
-            train_entity_ids , test_entity_ids = train_test_split(entity_ids , test_size=0.2 , random_state=42)
+            entity_ids , X , y = self.load_matrix()
+            y = y.astype(int)
 
-            train_data = self.load_data_from_redis(train_entity_ids)
-            test_data = self.load_data_from_redis(test_entity_ids)
+            # Split by a hash of CLIENTNUM, so a customer stays on the same
+            # side however many customers the store holds and in what order
+            entity_ids = np.asarray(entity_ids)
+            is_test = hash_split_mask(entity_ids , test_size=0.2)
+            train_idx , test_idx = np.flatnonzero(~is_test) , np.flatnonzero(is_test)
+            self.train_ids = entity_ids[train_idx]
+            self.test_ids = entity_ids[test_idx]
 
-            train_df = pd.DataFrame(train_data)
-            test_df = pd.DataFrame(test_data)
-
-            X_train = train_df.drop('Attrition_Flag',axis=1)
+            X_train = pd.DataFrame(X[train_idx] , columns=FEATURE_COLUMNS)
             logger.info(X_train.columns)
-            X_test = test_df.drop('Attrition_Flag',axis=1)
-            y_train = train_df['Attrition_Flag']
-            y_test = test_df['Attrition_Flag']
+            X_test = pd.DataFrame(X[test_idx] , columns=FEATURE_COLUMNS)
+            y_train = y[train_idx]
+            y_test = y[test_idx]
 
             logger.info("Preparation for Model Training completed")
             return X_train , X_test , y_train, y_test
         
         except Exception as e:
             logger.error(f"Error while preparing data {e}")
-            raise CustomException(str(e))
+            raise CustomException(str(e) , sys)
         
+    def build_search(self):
+        # One LightGBM thread per fit when fits already run in parallel
+        lgb_classifier = lgb.LGBMClassifier(objective='binary', boosting_type='gbdt',
+                                            n_jobs=1 if self.n_jobs != 1 else None, verbose=-1)
+
+        if self.search_mode == "halving":
+            param_grid = {key: values for key , values in PARAM_GRID.items() if key != 'n_estimators'}
+            return HalvingGridSearchCV(estimator=lgb_classifier, param_grid=param_grid,
+                                       resource='n_estimators', max_resources=MAX_ESTIMATORS, factor=3,
+                                       scoring='accuracy', cv=self.cv, n_jobs=self.n_jobs, random_state=42)
+
+        return GridSearchCV(estimator=lgb_classifier, param_grid=PARAM_GRID,
+                            scoring='accuracy', cv=self.cv, n_jobs=self.n_jobs)
+
+    def log_search_timings(self , search , wall_time):
+        """Per-trial fit time and the speedup over running every fit serially"""
+        results = search.cv_results_
+        n_splits = search.n_splits_
+        trial_seconds = (np.asarray(results['mean_fit_time']) + np.asarray(results['mean_score_time'])) * n_splits
+
+        for step , (params , seconds) in enumerate(zip(results['params'] , trial_seconds)):
+            mlflow.log_metric("search_trial_seconds" , float(seconds) , step=step)
+            logger.info(f"Trial {step} {params} took {seconds:.2f}s over {n_splits} folds")
+
+        serial_time = float(trial_seconds.sum())
+        mlflow.log_metrics({
+            "search_trials": len(trial_seconds),
+            "search_wall_seconds": wall_time,
+            "search_serial_seconds": serial_time,
+            "search_speedup": serial_time / wall_time if wall_time else 0.0,
+        })
+        logger.info(f"{self.search_mode} search: {len(trial_seconds)} trials in {wall_time:.2f}s "
+                    f"({serial_time:.2f}s of fits, {serial_time / max(wall_time , 1e-9):.1f}x speedup)")
+
+    def dataset_cv_search(self , X_train , y_train):
+        """Grid search with lgb.cv over a cached, already binned Dataset"""
+        dataset , info = load_or_build_dataset(X_train , y_train , FEATURE_COLUMNS , self.dataset_cache_dir)
+
+        start = time.perf_counter()
+        best = None
+        candidates = list(product(PARAM_GRID['num_leaves'] , PARAM_GRID['learning_rate']))
+        for step , (num_leaves , learning_rate) in enumerate(candidates):
+            params = dict(DATASET_PARAMS , objective='binary' , metric='binary_error' ,
+                          num_leaves=num_leaves , learning_rate=learning_rate ,
+                          num_threads=0 if self.n_jobs == -1 else self.n_jobs)
+
+            trial_start = time.perf_counter()
+            history = lgb.cv(params , dataset , num_boost_round=MAX_ESTIMATORS , nfold=self.cv , stratified=True , seed=42)
+            trial_seconds = time.perf_counter() - trial_start
+
+            errors = history['valid binary_error-mean']
+            n_estimators = int(np.argmin(errors)) + 1
+            score = 1.0 - float(errors[n_estimators - 1])
+            mlflow.log_metric("search_trial_seconds" , trial_seconds , step=step)
+            logger.info(f"Trial {step} num_leaves={num_leaves} learning_rate={learning_rate} "
+                        f"best at {n_estimators} trees , accuracy {score:.4f} , took {trial_seconds:.2f}s")
+
+            if best is None or score > best[0]:
+                best = (score , {'num_leaves': num_leaves , 'learning_rate': learning_rate , 'n_estimators': n_estimators})
+        wall_time = time.perf_counter() - start
+
+        # Time saved is what loading the cached Dataset saved over binning
+        # the data again, as measured; nothing on a cache miss
+        time_saved = info['construct_seconds'] - info['seconds'] if info['cache_hit'] else 0.0
+        mlflow.log_metrics({
+            "search_trials": len(candidates),
+            "search_wall_seconds": wall_time,
+            "dataset_cache_hit": int(info['cache_hit']),
+            "dataset_seconds": info['seconds'],
+            "dataset_construct_seconds": info['construct_seconds'],
+            "dataset_time_saved_seconds": time_saved,
+        })
+        logger.info(f"Dataset {info['fingerprint']} ({'cached' if info['cache_hit'] else 'built'}) took {info['seconds']:.3f}s , "
+                    f"building it took {info['construct_seconds']:.3f}s , {time_saved:.3f}s saved")
+
+        # The final model is trained on the same binned Dataset as the search
+        params = dict(DATASET_PARAMS , objective='binary' , num_leaves=best[1]['num_leaves'] , learning_rate=best[1]['learning_rate'] ,
+                      num_threads=0 if self.n_jobs == -1 else self.n_jobs)
+        booster = lgb.train(params , dataset , num_boost_round=best[1]['n_estimators'])
+        prune_datasets(self.dataset_cache_dir)
+
+        best_model = classifier_from_booster(booster , y_train , objective='binary' , boosting_type='gbdt' , verbose=-1 , **best[1])
+        return best_model , best[1]
+
     def hyperparamter_tuning(self,X_train,y_train):
         try:
-            param_grid = {
-                'num_leaves': [5, 20, 31],
-                'learning_rate': [0.05, 0.1, 0.2],
-                'n_estimators': [50, 100, 150]
-            }
-            
-            lgb_classifier = lgb.LGBMClassifier(objective='binary', boosting_type='gbdt')
-            grid_search = GridSearchCV(estimator=lgb.LGBMClassifier, param_grid=param_grid,
-                           scoring='accuracy', cv=5)
+            if self.search_mode == "dataset_cv":
+                best_model , best_params = self.dataset_cv_search(X_train , y_train)
+                logger.info(f"Best paramters : {best_params}")
+                return best_model
+
+            grid_search = self.build_search()
 
             # Fit the model to the training data to search for the best hyperparameters
+            start = time.perf_counter()
             grid_search.fit(X_train, y_train)
+            self.log_search_timings(grid_search , time.perf_counter() - start)
 
             # Get the best hyperparameters and their values
             best_params = grid_search.best_params_
             best_hyperparameters = list(best_params.keys())
             best_values = list(best_params.values())
 
-            # Train a LightGBM model with the best hyperparameters
-            best_model = lgb_classifier(**best_params)
-            best_model.fit(X_train, y_train)
-
-
             logger.info(f"Best paramters : {best_params}")
             logger.info(f"Best hyperparamters : {best_hyperparameters}")
             logger.info(f"Best values : {best_values}")
+            # Already refit on the full training set by the search
             return grid_search.best_estimator_
         
         except Exception as e:
             logger.error(f"Error while hyperparamter tuning {e}")
-            raise CustomException(str(e))
-        
+            raise CustomException(str(e) , sys)
+
     def train_and_evaluate(self , X_train , y_train , X_test , y_test):
         try:
             best_model = self.hyperparamter_tuning(X_train,y_train)
@@ -114,39 +256,108 @@ class ModelTraining:
         
         except Exception as e:
             logger.error(f"Error while model training {e}")
-            raise CustomException(str(e))
+            raise CustomException(str(e) , sys)
     
+    def load_previous_model(self):
+        model_filename = f"{self.model_save_path}lgb_model.pkl"
+        if not os.path.exists(model_filename):
+            return None
+        with open(model_filename , 'rb') as model_file:
+            return pickle.load(model_file)
+
+    def incremental_update(self , previous_model , X_train , y_train , X_test , y_test , changed_ids):
+        """Continue boosting `previous_model` on the changed customers.
+
+        The continued model is kept when its holdout accuracy is within
+        `incremental_tolerance` of the guard: the previous model, or with
+        incremental_guard="full_retrain" a full retrain with the previous
+        hyperparameters on the whole training split. Otherwise a full
+        retrain replaces it.
+        """
+        try:
+            changed = np.isin(self.train_ids , np.asarray(list(changed_ids) , dtype=str))
+            params = previous_model.get_params()
+
+            start = time.perf_counter()
+            if changed.any():
+                continued = lgb.LGBMClassifier(**dict(params , n_estimators=self.incremental_estimators))
+                continued.fit(X_train[changed] , y_train[changed] , init_model=previous_model.booster_)
+            else:
+                continued = previous_model
+            incremental_seconds = time.perf_counter() - start
+            incremental_accuracy = accuracy_score(y_test , continued.predict(X_test))
+
+            full , full_seconds = None , 0.0
+            if self.incremental_guard == "full_retrain":
+                start = time.perf_counter()
+                full = lgb.LGBMClassifier(**params).fit(X_train , y_train)
+                full_seconds = time.perf_counter() - start
+                guard_accuracy = accuracy_score(y_test , full.predict(X_test))
+            else:
+                guard_accuracy = accuracy_score(y_test , previous_model.predict(X_test))
+            accepted = incremental_accuracy >= guard_accuracy - self.incremental_tolerance
+
+            if not accepted and full is None:
+                start = time.perf_counter()
+                full = lgb.LGBMClassifier(**params).fit(X_train , y_train)
+                full_seconds = time.perf_counter() - start
+
+            mlflow.log_metrics({
+                "incremental_rows": int(changed.sum()),
+                "incremental_seconds": incremental_seconds,
+                "incremental_accuracy": incremental_accuracy,
+                "incremental_guard_accuracy": guard_accuracy,
+                "full_retrain_seconds": full_seconds,
+                "incremental_accepted": int(accepted),
+            })
+            logger.info(f"Incremental update on {int(changed.sum())} rows: accuracy {incremental_accuracy:.4f} in {incremental_seconds:.2f}s , "
+                        f"{self.incremental_guard} guard {guard_accuracy:.4f} , {'keeping' if accepted else 'rejecting'} the incremental model"
+                        + (f" , full retrain took {full_seconds:.2f}s" if full is not None else ""))
+            return continued if accepted else full
+
+        except Exception as e:
+            logger.error(f"Error while incremental training {e}")
+            raise CustomException(str(e) , sys)
+
     def save_model(self , model):
         try:
-            with mlflow.start_run():
-                model_filename = f"{self.model_save_path}lgb_model.pkl"
+            model_filename = f"{self.model_save_path}lgb_model.pkl"
 
-                with open(model_filename,'wb') as model_file:
-                    pickle.dump(model , model_file)
+            with open(model_filename,'wb') as model_file:
+                pickle.dump(model , model_file)
 
-                logger.info(f"Model saved at {model_filename}")
-                mlflow.log_artifact(self.model_output_path)
+            logger.info(f"Model saved at {model_filename}")
+            mlflow.log_artifact(model_filename)
         except Exception as e:
             logger.error(f"Error while model saving {e}")
-            raise CustomException(str(e))
+            raise CustomException(str(e) , sys)
         
-    def run(self):
+    def run(self , changed_ids=None):
+        """Full search and training, or with `changed_ids` an incremental
+        update of the saved model (a full run when there is none yet)"""
         try:
             with mlflow.start_run():
                 logger.info("Starting Model Training Pipleine....")
                 logger.info("Starting our MLFLOW experimentation")
                 X_train , X_test , y_train, y_test = self.prepare_data()
 
-                accuracy = self.train_and_evaluate(X_train , y_train, X_test , y_test)
+                previous_model = self.load_previous_model() if changed_ids is not None else None
+                if previous_model is not None:
+                    best_model = self.incremental_update(previous_model , X_train , y_train , X_test , y_test , changed_ids)
+                    accuracy = accuracy_score(y_test , best_model.predict(X_test))
+                    self.save_model(best_model)
+                    mlflow.log_params(best_model.get_params())
+                else:
+                    accuracy = self.train_and_evaluate(X_train , y_train, X_test , y_test)
                 logger.info(f"Accuracy = {accuracy}")
-                mlflow.log_metric(accuracy)
+                mlflow.log_metric("accuracy" , accuracy)
                 mlflow.log_artifact(self.model_save_path, artifact_path="model")
 
                 logger.info("End of Model Training pipeline...")
 
         except Exception as e:
             logger.error(f"Error while model training pipeline {e}")
-            raise CustomException(str(e))
+            raise CustomException(str(e) , sys)
         
 if __name__ == "__main__":
     feature_store = RedisFeatureStore()
@@ -0,0 +1,124 @@
+import sys
+import os
+import json
+import time
+import shutil
+import hashlib
+import numpy as np
+from sklearn.preprocessing import StandardScaler
+from src.feature_store import RedisFeatureStore
+from src.logger import get_logger
+from src.custom_exception import CustomException
+from config.path_config import *
+from config.feature_config import FEATURE_COLUMNS
+
+logger = get_logger(__name__)
+
+# Pointer file naming the snapshot version the service should load
+LATEST_FILE = "LATEST"
+
+
+def build_reference_snapshot(feature_store : RedisFeatureStore , output_dir=REFERENCE_DIR , columns=FEATURE_COLUMNS):
+    """Fit the scaler on the feature store and write a versioned snapshot.
+
+    A snapshot directory holds `reference.npy` (the scaled reference matrix,
+    loadable with mmap), `scaler.npz` (StandardScaler parameters) and
+    `meta.json`. LATEST is switched to it only once every file is written.
+    """
+    try:
+        start = time.perf_counter()
+        _ , reference , _ = feature_store.export_matrix(columns , label_column=None)
+
+        scaler = StandardScaler()
+        reference = scaler.fit_transform(reference).astype(np.float32)
+
+        digest = hashlib.sha256(reference.tobytes()).hexdigest()[:12]
+        version = f"{time.strftime('%Y%m%dT%H%M%S')}-{digest}"
+
+        os.makedirs(output_dir , exist_ok=True)
+        staging_dir = os.path.join(output_dir , f".{version}.tmp")
+        os.makedirs(staging_dir , exist_ok=True)
+
+        np.save(os.path.join(staging_dir , "reference.npy") , reference)
+        np.savez(
+            os.path.join(staging_dir , "scaler.npz"),
+            mean=scaler.mean_,
+            scale=scaler.scale_,
+            var=scaler.var_,
+            n_samples_seen=scaler.n_samples_seen_,
+        )
+        with open(os.path.join(staging_dir , "meta.json") , "w") as f:
+            json.dump({
+                "version": version,
+                "columns": list(columns),
+                "n_rows": int(reference.shape[0]),
+                "created_at": time.strftime('%Y-%m-%dT%H:%M:%S'),
+            } , f , indent=2)
+
+        snapshot_dir = os.path.join(output_dir , version)
+        os.replace(staging_dir , snapshot_dir)
+
+        pointer_tmp = os.path.join(output_dir , f".{LATEST_FILE}.tmp")
+        with open(pointer_tmp , "w") as f:
+            f.write(version)
+        os.replace(pointer_tmp , os.path.join(output_dir , LATEST_FILE))
+
+        logger.info(f"Reference snapshot {version} written ({reference.shape[0]} rows) in {time.perf_counter() - start:.2f}s")
+        return snapshot_dir
+
+    except Exception as e:
+        logger.error(f"Error while building reference snapshot {e}")
+        raise CustomException(str(e) , sys)
+
+
+def resolve_snapshot_dir(path=REFERENCE_DIR):
+    """Accept a snapshot directory or a root holding a LATEST pointer"""
+    pointer = os.path.join(path , LATEST_FILE)
+    if os.path.exists(pointer):
+        with open(pointer) as f:
+            return os.path.join(path , f.read().strip())
+    return path
+
+
+def load_reference_snapshot(path=REFERENCE_DIR , columns=FEATURE_COLUMNS , mmap_mode="r"):
+    """Load (scaler, reference, meta) from a snapshot.
+
+    The reference matrix is memory-mapped read-only by default, so every
+    process loading the same snapshot shares one copy in the page cache.
+    """
+    snapshot_dir = resolve_snapshot_dir(path)
+
+    with open(os.path.join(snapshot_dir , "meta.json")) as f:
+        meta = json.load(f)
+    if meta["columns"] != list(columns):
+        raise ValueError(f"Snapshot {meta['version']} was built for a different feature column order")
+
+    reference = np.load(os.path.join(snapshot_dir , "reference.npy") , mmap_mode=mmap_mode)
+
+    params = np.load(os.path.join(snapshot_dir , "scaler.npz"))
+    scaler = StandardScaler()
+    scaler.mean_ = params["mean"]
+    scaler.scale_ = params["scale"]
+    scaler.var_ = params["var"]
+    scaler.n_samples_seen_ = params["n_samples_seen"]
+    scaler.n_features_in_ = len(columns)
+
+    return scaler , reference , meta
+
+
+def prune_snapshots(output_dir=REFERENCE_DIR , keep=3):
+    """Remove all but the `keep` newest snapshot versions"""
+    current = os.path.basename(resolve_snapshot_dir(output_dir))
+    versions = sorted(
+        name for name in os.listdir(output_dir)
+        if os.path.isdir(os.path.join(output_dir , name)) and not name.startswith(".")
+    )
+    for name in versions[:-keep]:
+        if name != current:
+            shutil.rmtree(os.path.join(output_dir , name))
+
+
+if __name__=="__main__":
+    feature_store = RedisFeatureStore()
+    build_reference_snapshot(feature_store)
+    prune_snapshots()
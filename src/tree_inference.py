@@ -0,0 +1,240 @@
+import numpy as np
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+# LightGBM missing_type values, as in its model dump
+MISSING_NONE = 0
+MISSING_ZERO = 1
+MISSING_NAN = 2
+MISSING_TYPES = {"None": MISSING_NONE, "Zero": MISSING_ZERO, "NaN": MISSING_NAN}
+
+# LightGBM treats |x| <= kZeroThreshold (a C++ float) as zero
+ZERO_THRESHOLD = float(np.float32(1e-35))
+
+
+class CompiledBooster:
+    """A LightGBM binary classifier compiled into flat NumPy arrays.
+
+    All trees are flattened into shared node arrays (split feature,
+    threshold, first child, default direction, missing type, leaf value).
+    The two children of a split sit next to each other, so stepping down a
+    level is `child = left + go_right`. Leaves point to themselves with an
+    infinite threshold, which lets a whole batch step every (row, tree)
+    pair down in lock-step; trees are ordered deepest first so each level
+    only touches the trees that are still that deep. Leaf values are then
+    summed tree by tree in LightGBM's order.
+    """
+
+    def __init__(self , booster):
+        dump = booster.dump_model()
+
+        objective = dump.get("objective" , "")
+        if not objective.startswith("binary") or dump.get("num_class" , 1) != 1:
+            raise ValueError(f"Only binary LightGBM models can be compiled, got '{objective}'")
+        self.sigmoid = 1.0
+        for token in objective.split():
+            if token.startswith("sigmoid:"):
+                self.sigmoid = float(token.split(":")[1])
+        self.average_output = dump.get("average_output" , False)
+        self.n_features = dump["max_feature_idx"] + 1
+
+        feature , threshold , left = [] , [] , []
+        default_left , missing_type , value = [] , [] , []
+
+        def allocate(n):
+            start = len(feature)
+            feature.extend([0] * n)
+            threshold.extend([np.inf] * n)
+            left.extend(range(start , start + n))
+            default_left.extend([True] * n)
+            missing_type.extend([MISSING_NONE] * n)
+            value.extend([0.0] * n)
+            return start
+
+        def compile_node(node , idx):
+            """Fill slot `idx`; returns the depth of the subtree below it"""
+            if "leaf_value" in node:
+                # Leaves loop back to themselves whatever the input
+                value[idx] = node["leaf_value"]
+                return 0
+
+            if node["decision_type"] != "<=":
+                raise ValueError(f"Unsupported split '{node['decision_type']}' (categorical splits are not compiled)")
+            children = allocate(2)
+            feature[idx] = node["split_feature"]
+            threshold[idx] = node["threshold"]
+            left[idx] = children
+            default_left[idx] = node["default_left"]
+            missing_type[idx] = MISSING_TYPES[node["missing_type"]]
+            return 1 + max(
+                compile_node(node["left_child"] , children),
+                compile_node(node["right_child"] , children + 1),
+            )
+
+        roots , depths = [] , []
+        for tree in dump["tree_info"]:
+            if tree.get("is_linear"):
+                raise ValueError("Linear trees are not supported")
+            root = allocate(1)
+            roots.append(root)
+            depths.append(compile_node(tree["tree_structure"] , root))
+
+        self.feature = np.array(feature , dtype=np.intp)
+        self.threshold = np.array(threshold , dtype=np.float64)
+        self.left = np.array(left , dtype=np.intp)
+        self.default_left = np.array(default_left , dtype=bool)
+        self.missing_type = np.array(missing_type , dtype=np.int8)
+        self.value = np.array(value , dtype=np.float64)
+        self.n_trees = len(roots)
+        self.has_missing_rules = bool((self.missing_type != MISSING_NONE).any())
+        self.has_zero_rules = bool((self.missing_type == MISSING_ZERO).any())
+
+        # Deepest trees first: at level L only the first active_trees[L]
+        # columns still have to move
+        depths = np.array(depths , dtype=np.intp)
+        self.order = np.argsort(-depths , kind="stable")
+        self.roots = np.array(roots , dtype=np.intp)[self.order]
+        self.max_depth = int(depths.max()) if len(depths) else 0
+        self.active_trees = [int((depths > level).sum()) for level in range(self.max_depth)]
+        # Column of each original tree after sorting, for summing in order
+        self.position = np.empty(self.n_trees , dtype=np.intp)
+        self.position[self.order] = np.arange(self.n_trees)
+
+        logger.info(f"Compiled {self.n_trees} trees , {len(feature)} nodes , max depth {self.max_depth}")
+
+    @classmethod
+    def from_model(cls , model):
+        """Compile an LGBMClassifier (or a raw Booster)"""
+        return cls(getattr(model , "booster_" , model))
+
+    def _go_right(self , fval , nodes , plain):
+        if plain:
+            return fval > self.threshold.take(nodes)
+
+        missing = self.missing_type.take(nodes)
+        is_nan = np.isnan(fval)
+        fval = np.where(is_nan & (missing != MISSING_NAN) , 0.0 , fval)
+        use_default = ((missing == MISSING_ZERO) & (np.abs(fval) <= ZERO_THRESHOLD)) | ((missing == MISSING_NAN) & is_nan)
+        return np.where(use_default , ~self.default_left.take(nodes) , ~(fval <= self.threshold.take(nodes)))
+
+    def predict_leaves(self , X):
+        """Leaf node reached in every tree, shape (n_rows, n_trees), columns
+        in `self.order`"""
+        X = np.array(X , dtype=np.float64 , ndmin=2 , order="C")
+        has_nan = bool(np.isnan(X).any())
+        if has_nan and not self.has_missing_rules:
+            # LightGBM reads NaN as 0.0 where missing_type=None
+            X[np.isnan(X)] = 0.0
+            has_nan = False
+        # Without NaN input or Zero-as-missing splits every split is a plain `<=`
+        plain = not has_nan and not self.has_zero_rules
+
+        flat = X.ravel()
+        offsets = np.arange(len(X)) * X.shape[1]
+
+        # Trees along the first axis, so the still-active trees are a
+        # contiguous block of rows
+        nodes = np.repeat(self.roots[: , None] , len(X) , axis=1)
+        for active in self.active_trees:
+            current = nodes[:active]
+            fval = flat.take(offsets + self.feature.take(current))
+            nodes[:active] = self.left.take(current) + self._go_right(fval , current , plain)
+        return nodes.T
+
+    def predict_raw(self , X):
+        leaf_values = self.value.take(self.predict_leaves(X))
+        # Accumulate tree by tree, in LightGBM's order, for identical rounding
+        raw = np.zeros(len(leaf_values) , dtype=np.float64)
+        for column in self.position:
+            raw += leaf_values[: , column]
+        if self.average_output:
+            raw /= self.n_trees
+        return raw
+
+    def predict_proba(self , X):
+        p = 1.0 / (1.0 + np.exp(-self.sigmoid * self.predict_raw(X)))
+        return np.column_stack([1.0 - p , p])
+
+    def predict(self , X):
+        return (self.predict_proba(X)[: , 1] > 0.5).astype(int)
+
+    def probe_inputs(self , n_rows=2048 , seed=0):
+        """Rows built from the split thresholds and their neighbours, so both
+        sides of every boundary (plus 0 and NaN) get exercised"""
+        rng = np.random.default_rng(seed)
+        X = rng.normal(size=(n_rows , self.n_features))
+        splits = np.isfinite(self.threshold)
+        for j in range(self.n_features):
+            thresholds = self.threshold[splits & (self.feature == j)]
+            if len(thresholds) == 0:
+                continue
+            candidates = np.concatenate([
+                thresholds,
+                np.nextafter(thresholds , np.inf),
+                np.nextafter(thresholds , -np.inf),
+                [0.0 , np.nan],
+            ])
+            X[: , j] = rng.choice(candidates , size=n_rows)
+        return X
+
+    def verify(self , model , X=None , atol=1e-12):
+        """Max |difference| against LightGBM's own probabilities; raises if
+        it exceeds `atol`"""
+        booster = getattr(model , "booster_" , model)
+        X = self.probe_inputs() if X is None else X
+        expected = booster.predict(X)
+        diff = float(np.max(np.abs(self.predict_proba(X)[: , 1] - expected))) if len(X) else 0.0
+        if diff > atol:
+            raise ValueError(f"Compiled model differs from LightGBM by {diff}")
+        return diff
+
+
+class BoosterPredictor:
+    """Scores with the fitted Booster directly, skipping the sklearn
+    wrapper's per-call input validation"""
+
+    def __init__(self , model):
+        self.booster = getattr(model , "booster_" , model)
+
+    def predict_proba(self , X):
+        p = self.booster.predict(X)
+        return np.column_stack([1.0 - p , p])
+
+
+class SklearnPredictor:
+    """The unmodified LGBMClassifier.predict_proba path"""
+
+    def __init__(self , model):
+        self.model = model
+
+    def predict_proba(self , X):
+        return self.model.predict_proba(X)
+
+
+INFERENCE_BACKENDS = {
+    "booster": BoosterPredictor,
+    "compiled": CompiledBooster.from_model,
+    "sklearn": SklearnPredictor,
+}
+
+
+def build_predictor(model , backend="booster"):
+    """Predictor exposing predict_proba(X) for `model`.
+
+    The compiled backend is checked against LightGBM on probe inputs first
+    and falls back to the booster backend if it cannot be compiled or does
+    not match.
+    """
+    if backend not in INFERENCE_BACKENDS:
+        raise ValueError(f"Unknown inference backend {backend}")
+    if backend == "compiled":
+        try:
+            compiled = CompiledBooster.from_model(model)
+            diff = compiled.verify(model)
+            logger.info(f"Compiled model verified against LightGBM , max |diff| = {diff}")
+            return compiled
+        except Exception as e:
+            logger.warning(f"Falling back to the booster backend {e}")
+            backend = "booster"
+    return INFERENCE_BACKENDS[backend](model)
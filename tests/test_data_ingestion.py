@@ -0,0 +1,84 @@
+"""DataIngestion against a SQLite stand-in for the PostgreSQL source table."""
+import json
+import sqlite3
+
+import pytest
+
+from src.artifact_io import read_frame
+from src.custom_exception import CustomException
+from src.data_ingestion import DataIngestion
+
+N_ROWS = 1000
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """customers table with CLIENTNUM, a feature and an updated_at batch id"""
+    path = tmp_path / "customers.db"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE customers (CLIENTNUM INTEGER, Customer_Age INTEGER, updated_at INTEGER)")
+    conn.executemany(
+        "INSERT INTO customers VALUES (?, ?, ?)",
+        [(700000000 + i, 20 + i % 50, i // 100) for i in range(N_ROWS)],
+    )
+    conn.commit()
+    conn.close()
+
+    # Outputs go to the relative artifacts/ paths of config/path_config.py
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("INGEST_TABLE", "customers")
+    return path
+
+
+def ingest(database, output_format="parquet", **kwargs):
+    ingestion = DataIngestion(None, "artifacts/raw", output_format=output_format,
+                              connect=lambda: sqlite3.connect(database), **kwargs)
+    ingestion.run()
+    return ingestion
+
+
+def split_ids(ingestion):
+    train = read_frame(ingestion.output_paths['train'], columns=['CLIENTNUM'])
+    test = read_frame(ingestion.output_paths['test'], columns=['CLIENTNUM'])
+    return train['CLIENTNUM'].tolist(), test['CLIENTNUM'].tolist()
+
+
+@pytest.mark.parametrize("output_format", ["parquet", "csv"])
+@pytest.mark.parametrize("streaming", [False, True])
+def test_split_covers_every_row_once(database, output_format, streaming):
+    ingestion = ingest(database, output_format, streaming=streaming, fetch_size=64)
+    train, test = split_ids(ingestion)
+
+    assert sorted(train + test) == [700000000 + i for i in range(N_ROWS)]
+    assert not set(train) & set(test)
+    assert ingestion.row_count == N_ROWS
+    assert 0.1 < len(test) / N_ROWS < 0.3
+
+
+def test_streaming_split_does_not_depend_on_fetch_size(database):
+    splits = []
+    for fetch_size in (1, 7, 100, N_ROWS * 2):
+        train, test = split_ids(ingest(database, streaming=True, fetch_size=fetch_size))
+        splits.append((sorted(train), sorted(test)))
+    assert all(split == splits[0] for split in splits)
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_watermark_tracks_the_extracted_rows(database, tmp_path, streaming):
+    full = ingest(database, streaming=streaming)
+    assert full.new_high_water_mark == (N_ROWS - 1) // 100
+
+    state_path = tmp_path / "state.json"
+    state_path.write_text(json.dumps({'high_water_mark': 7}))
+    delta = ingest(database, streaming=streaming, incremental=True, state_path=str(state_path), fetch_size=64)
+
+    assert delta.row_count == N_ROWS - 800
+    assert sorted(delta.entity_ids) == [str(700000000 + i) for i in range(800, N_ROWS)]
+    assert delta.new_high_water_mark == (N_ROWS - 1) // 100
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_incremental_requires_the_watermark_column(database, tmp_path, streaming):
+    with pytest.raises(CustomException, match="Watermark column missing_column"):
+        ingest(database, streaming=streaming, incremental=True, watermark_column="missing_column",
+               state_path=str(tmp_path / "state.json"))
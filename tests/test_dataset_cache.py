@@ -0,0 +1,76 @@
+"""Cached binned Datasets and the classifier served from a Booster trained on one."""
+import pickle
+
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.dataset_cache import DATASET_PARAMS, classifier_from_booster, load_or_build_dataset
+
+N_FEATURES = 8
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(2000, N_FEATURES)).astype(np.float32)
+    y = (X[:, 0] + 0.5 * rng.normal(size=len(X)) > 0).astype(int)
+    return pd.DataFrame(X, columns=[f"f{i}" for i in range(N_FEATURES)]), y
+
+
+@pytest.fixture
+def columns(data):
+    return list(data[0].columns)
+
+
+def train(X, y, columns, cache_dir, num_boost_round=20):
+    dataset, info = load_or_build_dataset(X, y, columns, str(cache_dir))
+    params = dict(DATASET_PARAMS, objective='binary', num_leaves=15, learning_rate=0.1)
+    booster = lgb.train(params, dataset, num_boost_round=num_boost_round)
+    expected = booster.predict(X)
+    model = classifier_from_booster(booster, y, objective='binary', boosting_type='gbdt', verbose=-1,
+                                    num_leaves=15, learning_rate=0.1, n_estimators=num_boost_round)
+    return model, expected, info
+
+
+def test_second_load_hits_the_cache(data, columns, tmp_path):
+    X, y = data
+    _, first = load_or_build_dataset(X, y, columns, str(tmp_path))
+    dataset, second = load_or_build_dataset(X, y, columns, str(tmp_path))
+
+    assert not first['cache_hit'] and second['cache_hit']
+    assert second['fingerprint'] == first['fingerprint']
+    assert second['construct_seconds'] == first['construct_seconds']
+    assert np.array_equal(dataset.get_label(), y)
+
+
+def test_classifier_predicts_like_the_booster(data, columns, tmp_path):
+    X, y = data
+    model, expected, _ = train(X, y, columns, tmp_path)
+
+    probabilities = model.predict_proba(X)
+    assert probabilities.shape == (len(X), 2)
+    assert np.allclose(probabilities[:, 1], expected)
+    assert np.array_equal(model.predict(X), (expected > 0.5).astype(int))
+    assert list(model.classes_) == [0, 1]
+    assert model.n_features_in_ == N_FEATURES
+    assert model.booster_.num_trees() == 20
+
+
+def test_classifier_survives_a_pickle_round_trip(data, columns, tmp_path):
+    X, y = data
+    model, expected, _ = train(X, y, columns, tmp_path)
+
+    restored = pickle.loads(pickle.dumps(model))
+    assert np.allclose(restored.predict_proba(X)[:, 1], expected)
+    assert restored.get_params() == model.get_params()
+
+
+def test_classifier_continues_training(data, columns, tmp_path):
+    X, y = data
+    model, _, _ = train(X, y, columns, tmp_path)
+
+    continued = lgb.LGBMClassifier(**dict(model.get_params(), n_estimators=5))
+    continued.fit(X.iloc[:500], y[:500], init_model=model.booster_)
+    assert continued.booster_.num_trees() == 25
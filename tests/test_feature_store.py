@@ -0,0 +1,101 @@
+"""RedisFeatureStore against an in-process fakeredis server."""
+import json
+
+import numpy as np
+import pytest
+
+from config.feature_config import FEATURE_COLUMNS, LABEL_COLUMN
+from src.feature_store import ENTITY_INDEX_COMPLETE_KEY, ENTITY_INDEX_KEY, RedisFeatureStore
+
+fakeredis = pytest.importorskip("fakeredis")
+
+COLUMNS = [LABEL_COLUMN] + FEATURE_COLUMNS
+
+
+@pytest.fixture
+def store():
+    """Store whose clients talk to one fake server"""
+    server = fakeredis.FakeServer()
+    store = RedisFeatureStore(chunk_size=16)
+    store.client = fakeredis.FakeStrictRedis(server=server, decode_responses=True)
+    store.raw_client = fakeredis.FakeStrictRedis(server=server)
+    return store
+
+
+def rows(n, seed=0):
+    return np.random.default_rng(seed).normal(size=(n, len(COLUMNS))).astype(np.float32)
+
+
+def write_legacy(store, entity_ids, matrix):
+    """Entities as written before the index existed: JSON values, no index"""
+    for entity_id, row in zip(entity_ids, matrix):
+        store.raw_client.set(f"entity:{entity_id}:features", json.dumps(dict(zip(COLUMNS, row.tolist()))))
+
+
+def test_legacy_store_plus_one_write_returns_every_id(store):
+    legacy_ids = [str(i) for i in range(100)]
+    write_legacy(store, legacy_ids, rows(100))
+
+    store.store_features("new", dict(zip(COLUMNS, rows(1, seed=1)[0].tolist())))
+
+    expected = sorted(legacy_ids + ["new"])
+    assert sorted(store.get_all_entity_ids()) == expected
+    assert store.count_entities() == 101
+    assert store.client.exists(ENTITY_INDEX_COMPLETE_KEY)
+    ids, X, _ = store.export_matrix(FEATURE_COLUMNS, label_column=None)
+    assert sorted(ids) == expected and X.shape == (101, len(FEATURE_COLUMNS))
+
+
+def test_reads_scan_until_the_index_is_marked_complete(store):
+    legacy_ids = [str(i) for i in range(50)]
+    write_legacy(store, legacy_ids, rows(50))
+    # An index holding only some entities, as left by a writer that
+    # predates the completeness marker
+    store.client.sadd(ENTITY_INDEX_KEY, *legacy_ids[:5])
+
+    assert sorted(store.get_all_entity_ids()) == sorted(legacy_ids)
+    assert store.count_entities() == 50
+
+    assert store.backfill_entity_index() == 50
+    assert store.client.exists(ENTITY_INDEX_COMPLETE_KEY)
+    assert sorted(store.get_all_entity_ids()) == sorted(legacy_ids)
+
+
+def test_matrix_writes_are_indexed(store):
+    entity_ids = [str(i) for i in range(40)]
+    store.store_matrix(entity_ids, rows(40), COLUMNS)
+
+    assert store.client.scard(ENTITY_INDEX_KEY) == 40
+    assert sorted(store.get_all_entity_ids()) == sorted(entity_ids)
+
+
+@pytest.mark.parametrize("layout", ["json", "binary", "mixed"])
+def test_every_value_layout_exports_the_same_matrix(store, layout):
+    entity_ids = [str(i) for i in range(40)]
+    matrix = rows(40)
+    if layout == "json":
+        write_legacy(store, entity_ids, matrix)
+    elif layout == "binary":
+        store.store_matrix(entity_ids, matrix, COLUMNS)
+    else:
+        # Alternate layouts so every page mixes both
+        store.store_matrix(entity_ids[::2], matrix[::2], COLUMNS)
+        write_legacy(store, entity_ids[1::2], matrix[1::2])
+
+    ids, X, y = store.export_matrix(FEATURE_COLUMNS, label_column=LABEL_COLUMN, entity_ids=entity_ids)
+    assert ids == entity_ids
+    assert np.array_equal(X, matrix[:, 1:])
+    assert np.array_equal(y, matrix[:, 0])
+
+    values = store.raw_client.mget(store.feature_keys(entity_ids + ["missing"]))
+    decoded_ids, decoded, _ = store.decode_matrix(entity_ids + ["missing"], values, FEATURE_COLUMNS)
+    assert decoded_ids == entity_ids
+    assert np.array_equal(decoded, matrix[:, 1:])
+
+
+def test_json_values_missing_a_column_export_nan(store):
+    store.raw_client.set("entity:1:features", json.dumps({LABEL_COLUMN: 1.0, FEATURE_COLUMNS[0]: 2.5}))
+    assert store.get_features("1") == {LABEL_COLUMN: 1.0, FEATURE_COLUMNS[0]: 2.5}
+
+    _, X, _ = store.export_matrix(FEATURE_COLUMNS, label_column=None, entity_ids=["1"])
+    assert X[0, 0] == 2.5 and np.isnan(X[0, 1:]).all()